@@ -0,0 +1,46 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.scripts.change_feed_trigger import *
+
+# revision identifiers, used by Alembic.
+revision: str = '5d7f3b9e0a21'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1d5f902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('change_version_seq')))
+    for table in TRACKED_TABLES:
+        op.add_column(table, sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('change_version_seq')"), nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('clock_timestamp()'), nullable=False))
+        op.create_index(op.f(f'ix_{table}_version'), table, ['version'], unique=False)
+    op.create_table('change_tombstones',
+    sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('change_version_seq')"), nullable=False),
+    sa.Column('entity', sa.String(length=50), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('clock_timestamp()'), nullable=False),
+    sa.PrimaryKeyConstraint('version')
+    )
+
+    op.execute(TRACK_ROW_VERSION)
+    op.execute(RECORD_TOMBSTONE)
+    op.execute(TOUCH_ORGANIZATION_VERSION)
+    for statement in SETUP_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in DROP_TRIGGERS + DROP_FUNCTIONS:
+        op.execute(statement)
+    op.drop_table('change_tombstones')
+    for table in TRACKED_TABLES:
+        op.drop_index(op.f(f'ix_{table}_version'), table_name=table)
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
+    op.execute(sa.schema.DropSequence(sa.Sequence('change_version_seq')))
@@ -0,0 +1,42 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.scripts.change_feed_trigger import *
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e2f9d3b6'
+down_revision: Union[str, Sequence[str], None] = 'f3a6d2c8b1e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHANGE_TABLES = TRACKED_TABLES + ("change_tombstones",)
+
+TRACK_ROW_VERSION_WITHOUT_XACT_ID = """
+    CREATE OR REPLACE FUNCTION track_row_version() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := nextval('change_version_seq');
+        NEW.updated_at := clock_timestamp();
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in CHANGE_TABLES:
+        # Existing rows were committed long ago: they sort before any new change.
+        op.add_column(table, sa.Column('xact_id', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+        op.alter_column(table, 'xact_id', server_default=sa.text(f'({CURRENT_XACT_ID})'))
+        op.create_index(op.f(f'ix_{table}_xact_id_version'), table, ['xact_id', 'version'], unique=False)
+    op.execute(TRACK_ROW_VERSION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(TRACK_ROW_VERSION_WITHOUT_XACT_ID)
+    for table in CHANGE_TABLES:
+        op.drop_index(op.f(f'ix_{table}_xact_id_version'), table_name=table)
+        op.drop_column(table, 'xact_id')
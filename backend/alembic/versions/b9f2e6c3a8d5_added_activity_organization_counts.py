@@ -0,0 +1,35 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.scripts.activity_counts_trigger import *
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9f2e6c3a8d5'
+down_revision: Union[str, Sequence[str], None] = 'e7a3c9d1f4b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('activity_organization_counts',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('direct_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('branch_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('activity_id')
+    )
+
+    op.execute(REFRESH_ACTIVITY_ORGANIZATION_COUNTS)
+    for statement in SYNC_FUNCTIONS + SETUP_TRIGGERS:
+        op.execute(statement)
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in DROP_TRIGGERS + DROP_FUNCTIONS:
+        op.execute(statement)
+    op.drop_table('activity_organization_counts')
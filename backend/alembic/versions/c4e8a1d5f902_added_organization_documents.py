@@ -0,0 +1,45 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from src.scripts.organization_documents_trigger import *
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1d5f902'
+down_revision: Union[str, Sequence[str], None] = '8b2d4f6a1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('organization_documents',
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('building_id', sa.Integer(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('activity_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('document', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('organization_id')
+    )
+    op.create_index(op.f('ix_organization_documents_building_id'), 'organization_documents', ['building_id'], unique=False)
+    op.create_index('ix_organization_documents_lat_lon', 'organization_documents', ['latitude', 'longitude'], unique=False)
+    op.create_index('ix_organization_documents_activity_ids', 'organization_documents', ['activity_ids'], unique=False, postgresql_using='gin')
+
+    op.execute(REFRESH_ORGANIZATION_DOCUMENTS)
+    for statement in SYNC_FUNCTIONS + SETUP_TRIGGERS:
+        op.execute(statement)
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in DROP_TRIGGERS + DROP_FUNCTIONS:
+        op.execute(statement)
+    op.drop_index('ix_organization_documents_activity_ids', table_name='organization_documents', postgresql_using='gin')
+    op.drop_index('ix_organization_documents_lat_lon', table_name='organization_documents')
+    op.drop_index(op.f('ix_organization_documents_building_id'), table_name='organization_documents')
+    op.drop_table('organization_documents')
@@ -0,0 +1,44 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.scripts.organization_documents_trigger import *
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e1b5a7c2f4'
+down_revision: Union[str, Sequence[str], None] = 'a4c7e2f9d3b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DROP_ORGANIZATIONS_UPDATE_TRIGGER = (
+    "DROP TRIGGER IF EXISTS organization_documents_organizations_update ON organizations;"
+)
+
+SYNC_ORGANIZATIONS_WITHOUT_OLD_ROWS = """
+    CREATE OR REPLACE FUNCTION organization_documents_sync_organizations() RETURNS trigger AS $$
+    BEGIN
+        PERFORM refresh_organization_documents(ARRAY(SELECT id FROM new_rows));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+ORGANIZATIONS_UPDATE_TRIGGER_WITHOUT_OLD_ROWS = """
+    CREATE TRIGGER organization_documents_organizations_update
+    AFTER UPDATE ON organizations REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_organizations();
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(DROP_ORGANIZATIONS_UPDATE_TRIGGER)
+    op.execute(SYNC_ORGANIZATIONS)
+    op.execute(ORGANIZATIONS_UPDATE_TRIGGER)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(DROP_ORGANIZATIONS_UPDATE_TRIGGER)
+    op.execute(SYNC_ORGANIZATIONS_WITHOUT_OLD_ROWS)
+    op.execute(ORGANIZATIONS_UPDATE_TRIGGER_WITHOUT_OLD_ROWS)
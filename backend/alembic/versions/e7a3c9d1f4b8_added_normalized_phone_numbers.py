@@ -0,0 +1,23 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c9d1f4b8'
+down_revision: Union[str, Sequence[str], None] = '5d7f3b9e0a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('organization_phones', sa.Column('number_normalized', sa.String(length=50, collation='C'), sa.Computed("regexp_replace(number, '\\D', '', 'g')", persisted=True), nullable=False))
+    op.create_index(op.f('ix_organization_phones_number_normalized'), 'organization_phones', ['number_normalized'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_organization_phones_number_normalized'), table_name='organization_phones')
+    op.drop_column('organization_phones', 'number_normalized')
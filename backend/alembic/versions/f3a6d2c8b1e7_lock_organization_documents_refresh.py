@@ -0,0 +1,24 @@
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.scripts.organization_documents_trigger import *
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a6d2c8b1e7'
+down_revision: Union[str, Sequence[str], None] = 'b9f2e6c3a8d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(REFRESH_ORGANIZATION_DOCUMENTS)
+    # Documents already overwritten by concurrent writers are rendered again.
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The locking refresh works with the previous schema as well.
+    pass
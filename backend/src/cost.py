@@ -0,0 +1,136 @@
+import inspect
+import json
+import math
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Callable
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from src.database import LowPrioritySessionLocal
+
+GEO_MAX_ESTIMATED_ROWS = int(os.getenv("GEO_MAX_ESTIMATED_ROWS", "50000"))
+# What to do with queries above the threshold: reject, cap or low_priority.
+GEO_COST_POLICY = os.getenv("GEO_COST_POLICY", "cap")
+# Shrinking steps tried by the cap policy before the query is rejected.
+GEO_COST_CAP_ATTEMPTS = int(os.getenv("GEO_COST_CAP_ATTEMPTS", "5"))
+# The cap aims this far below the threshold, so it is not approached from
+# above in ever smaller steps.
+_CAP_TARGET = 0.9
+_MIN_CAP_EXPONENT = 0.25
+
+
+@dataclass(frozen=True)
+class CostDecision:
+    action: str
+    estimated_rows: int
+    # Factor to apply to the radius / rectangle sides when the query is capped.
+    scale: float = 1.0
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(_Explain)
+def _compile_explain(element, compiler, **kw):
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.stmt, **kw)}"
+
+
+async def estimate_rows(session: AsyncSession, stmt) -> int:
+    """Planner row estimate for ``stmt``, taken from ``EXPLAIN`` without running
+    the query. Parameters stay bound, as in the query itself."""
+    result = await session.execute(_Explain(stmt))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _too_expensive(estimated_rows: int):
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Query area is too large, narrow the search",
+        headers={
+            "X-Query-Cost-Estimate": str(estimated_rows),
+            "X-Query-Cost-Decision": "reject",
+        },
+    )
+
+
+async def guard_query_cost(
+    session: AsyncSession, response: Response, candidates: Callable[[float], object]
+) -> CostDecision:
+    """Estimate the cardinality of the candidate set of a geo query and apply
+    GEO_COST_POLICY when it exceeds GEO_MAX_ESTIMATED_ROWS. ``candidates(scale)``
+    returns the candidate statement for the area with its linear size
+    multiplied by ``scale``, or the candidate count (possibly awaitable) when
+    the caller already knows it. The cap policy shrinks the area and estimates again until it fits
+    (candidates do not grow with the square of the size on a sphere or with
+    uneven density), and rejects the query when GEO_COST_CAP_ATTEMPTS steps are
+    not enough. The decision is reported in the X-Query-Cost-* response
+    headers."""
+
+    async def estimate(scale: float) -> int:
+        value = candidates(scale)
+        if inspect.isawaitable(value):
+            value = await value
+        if isinstance(value, int):
+            return value
+        return await estimate_rows(session, value)
+
+    estimated_rows = await estimate(1.0)
+    if estimated_rows <= GEO_MAX_ESTIMATED_ROWS:
+        decision = CostDecision("allow", estimated_rows)
+    elif GEO_COST_POLICY == "reject":
+        raise _too_expensive(estimated_rows)
+    elif GEO_COST_POLICY == "low_priority":
+        decision = CostDecision("low_priority", estimated_rows)
+    else:
+        scale = 1.0
+        capped_rows = estimated_rows
+        # Candidates grow like scale ** exponent: 2 for a small area, less on
+        # a sphere-sized one or over uneven density. Start from the area and
+        # refit the exponent from the last two estimates after every step.
+        exponent = 2.0
+        for _ in range(GEO_COST_CAP_ATTEMPTS):
+            next_scale = scale * (_CAP_TARGET * GEO_MAX_ESTIMATED_ROWS / capped_rows) ** (
+                1 / exponent
+            )
+            next_rows = await estimate(next_scale)
+            if next_rows <= GEO_MAX_ESTIMATED_ROWS:
+                scale, capped_rows = next_scale, next_rows
+                break
+            if next_rows < capped_rows:
+                exponent = math.log(next_rows / capped_rows) / math.log(
+                    next_scale / scale
+                )
+            exponent = min(max(exponent, _MIN_CAP_EXPONENT), 2.0)
+            scale, capped_rows = next_scale, next_rows
+        else:
+            raise _too_expensive(estimated_rows)
+        decision = CostDecision("cap", estimated_rows, scale)
+
+    response.headers["X-Query-Cost-Estimate"] = str(decision.estimated_rows)
+    response.headers["X-Query-Cost-Decision"] = decision.action
+    if decision.action == "cap":
+        response.headers["X-Query-Cost-Scale"] = f"{decision.scale:.6f}"
+    return decision
+
+
+@asynccontextmanager
+async def decision_session(decision: CostDecision, session: AsyncSession):
+    """Session the query should run on: the request session, or one from the
+    low-priority pool."""
+    if decision.action != "low_priority":
+        yield session
+        return
+    async with LowPrioritySessionLocal() as low_priority_session:
+        yield low_priority_session
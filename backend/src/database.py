@@ -16,6 +16,34 @@ AsyncSessionLocal = async_sessionmaker(
     class_=AsyncSession,
 )
 
+# Separate, small pool for queries the cost guard deems expensive, so they
+# cannot exhaust the connections used by regular requests.
+LOW_PRIORITY_POOL_SIZE = int(os.getenv("LOW_PRIORITY_POOL_SIZE", "2"))
+
+low_priority_engine = create_async_engine(
+    DATABASE_URL, echo=True, pool_size=LOW_PRIORITY_POOL_SIZE, max_overflow=0
+)
+
+LowPrioritySessionLocal = async_sessionmaker(
+    bind=low_priority_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
+# Own small pool for the shared rate limiter: its per-request round trip must
+# not queue behind the connections it is meant to protect.
+RATE_LIMIT_POOL_SIZE = int(os.getenv("RATE_LIMIT_POOL_SIZE", "2"))
+RATE_LIMIT_POOL_TIMEOUT = float(os.getenv("RATE_LIMIT_POOL_TIMEOUT", "0.5"))
+
+rate_limit_engine = create_async_engine(
+    DATABASE_URL,
+    echo=True,
+    pool_size=RATE_LIMIT_POOL_SIZE,
+    max_overflow=0,
+    pool_timeout=RATE_LIMIT_POOL_TIMEOUT,
+)
+
 class Base(DeclarativeBase):
     pass
 
@@ -0,0 +1,150 @@
+import gzip
+import json
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _parse_quality_list(header: str) -> dict[str, float]:
+    values = {}
+    for item in header.split(","):
+        token, _, params = item.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        values[token.strip().lower()] = quality
+    return values
+
+
+def wants_msgpack(accept: str) -> bool:
+    if msgpack is None or not accept:
+        return False
+    qualities = _parse_quality_list(accept)
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality = qualities.get(
+        "application/json", qualities.get("application/*", qualities.get("*/*", 0.0))
+    )
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def choose_content_coding(accept_encoding: str) -> str | None:
+    if not accept_encoding:
+        return None
+    qualities = _parse_quality_list(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def _compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _negotiable(headers: Headers) -> bool:
+    return headers.get("content-type", "").startswith(
+        "application/json"
+    ) and "content-encoding" not in headers
+
+
+def _add_vary(headers: MutableHeaders):
+    # Every negotiable response depends on both headers, including the plain
+    # JSON one: without Vary a shared cache would serve it to msgpack or
+    # compressing clients too.
+    headers.add_vary_header("Accept")
+    headers.add_vary_header("Accept-Encoding")
+
+
+class EncodingMiddleware:
+    """Negotiates the representation of JSON responses: re-encodes them as
+    MessagePack when the client prefers ``application/msgpack`` and compresses
+    them with brotli or gzip when they are at least COMPRESSION_MIN_SIZE bytes.
+    Other responses pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        use_msgpack = wants_msgpack(request_headers.get("accept", ""))
+        coding = choose_content_coding(request_headers.get("accept-encoding", ""))
+        if not use_msgpack and coding is None:
+
+            async def vary_wrapper(message):
+                if message["type"] == "http.response.start" and _negotiable(
+                    Headers(raw=message["headers"])
+                ):
+                    _add_vary(MutableHeaders(raw=message["headers"]))
+                await send(message)
+
+            await self.app(scope, receive, vary_wrapper)
+            return
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                passthrough = not _negotiable(Headers(raw=message["headers"]))
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start_message["headers"])
+            if use_msgpack:
+                body = msgpack.packb(json.loads(body)) if body else body
+                headers["content-type"] = "application/msgpack"
+            _add_vary(headers)
+            if coding is not None and len(body) >= COMPRESSION_MIN_SIZE:
+                body = _compress(body, coding)
+                headers["content-encoding"] = coding
+            headers["content-length"] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
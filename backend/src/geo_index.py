@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import math
+import os
+
+from sqlalchemy import Integer, any_, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.database import engine
+from src.models import Building, ChangeTombstone
+from src.routers.api import EARTH_RADIUS, get_bounding_box
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger("uvicorn.error")
+
+GEO_INDEX_ENABLED = os.getenv("GEO_INDEX_ENABLED", "false").lower() == "true"
+GEO_INDEX_CELL_DEGREES = float(os.getenv("GEO_INDEX_CELL_DEGREES", "0.5"))
+GEO_INDEX_REFRESH_SECONDS = float(os.getenv("GEO_INDEX_REFRESH_SECONDS", "30"))
+# Above this many candidate buildings, organization queries filter by the
+# bounding box in SQL instead of sending the ids as one array parameter.
+GEO_INDEX_MAX_IDS = int(os.getenv("GEO_INDEX_MAX_IDS", "20000"))
+GEO_INDEX_LOAD_BATCH = 100_000
+
+
+class BuildingGeoIndex:
+    """Buildings bucketed into a fixed lat/lon grid, stored as flat arrays in
+    CSR layout: rows are sorted by cell and ``cell_starts[c]`` is the first row
+    of cell ``c``. A query only touches the rows of the cells overlapping its
+    bounding box, and distances are evaluated vectorized over those rows."""
+
+    def __init__(self, ids, latitudes, longitudes, cell_degrees: float = GEO_INDEX_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.lat_cells = math.ceil(180 / cell_degrees) + 1
+        self.lon_cells = math.ceil(360 / cell_degrees) + 1
+
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        cells = self._cell_rows(latitudes) * self.lon_cells + self._cell_columns(longitudes)
+        order = np.argsort(cells, kind="stable")
+
+        self.ids = np.asarray(ids, dtype=np.int32)[order]
+        self.latitudes = np.radians(latitudes[order])
+        self.longitudes = np.radians(longitudes[order])
+        self.cell_starts = np.searchsorted(
+            cells[order], np.arange(self.lat_cells * self.lon_cells + 1)
+        ).astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.ids.nbytes
+            + self.latitudes.nbytes
+            + self.longitudes.nbytes
+            + self.cell_starts.nbytes
+        )
+
+    def _cell_rows(self, latitudes):
+        return np.floor((np.asarray(latitudes) + 90) / self.cell_degrees).astype(np.int64)
+
+    def _cell_columns(self, longitudes):
+        return np.floor((np.asarray(longitudes) + 180) / self.cell_degrees).astype(np.int64)
+
+    def _candidate_rows(self, min_lat, max_lat, min_lon, max_lon):
+        first_row, last_row = self._cell_rows([max(min_lat, -90.0), min(max_lat, 90.0)])
+        first_column, last_column = self._cell_columns(
+            [max(min_lon, -180.0), min(max_lon, 180.0)]
+        )
+        # Within one grid row the cells of the box are contiguous.
+        rows = np.arange(first_row, last_row + 1) * self.lon_cells
+        starts = self.cell_starts[rows + first_column]
+        ends = self.cell_starts[rows + last_column + 1]
+        ranges = [np.arange(start, end) for start, end in zip(starts, ends) if end > start]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(ranges)
+
+    def in_rectangle(self, bounds: tuple[float, float, float, float]):
+        """Sorted ids of buildings inside ``(min_lat, max_lat, min_lon, max_lon)``."""
+        min_lat, max_lat, min_lon, max_lon = bounds
+        rows = self._candidate_rows(min_lat, max_lat, min_lon, max_lon)
+        latitudes = self.latitudes[rows]
+        longitudes = self.longitudes[rows]
+        mask = (
+            (latitudes >= math.radians(min_lat))
+            & (latitudes <= math.radians(max_lat))
+            & (longitudes >= math.radians(min_lon))
+            & (longitudes <= math.radians(max_lon))
+        )
+        return np.sort(self.ids[rows[mask]])
+
+    def in_radius(self, latitude: float, longitude: float, radius_km: float):
+        """Sorted ids of buildings within ``radius_km`` (haversine distance)."""
+        rows = self._candidate_rows(*get_bounding_box(latitude, longitude, radius_km))
+        latitudes = self.latitudes[rows]
+        central_lat = math.radians(latitude)
+        half_sin_lat = np.sin((latitudes - central_lat) / 2)
+        half_sin_lon = np.sin((self.longitudes[rows] - math.radians(longitude)) / 2)
+        a = half_sin_lat**2 + math.cos(central_lat) * np.cos(latitudes) * half_sin_lon**2
+        distances = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        return np.sort(self.ids[rows[distances <= radius_km]])
+
+
+async def search_in_thread(search, *args):
+    """Run an index search (``in_radius`` / ``in_rectangle``) in a worker
+    thread so the event loop keeps serving other requests."""
+    return await asyncio.to_thread(search, *args)
+
+
+async def count_in_thread(search, *args) -> int:
+    """Number of ids an index search finds, computed in a worker thread."""
+    return len(await search_in_thread(search, *args))
+
+
+def ids_condition(column, ids):
+    """``column = ANY(:ids)`` with the ids sent as a single array parameter."""
+    return column == any_(literal(ids.tolist(), ARRAY(Integer)))
+
+
+_geo_index: BuildingGeoIndex | None = None
+
+
+def get_geo_index() -> BuildingGeoIndex | None:
+    return _geo_index
+
+
+async def _buildings_state(conn):
+    result = await conn.execute(
+        select(
+            select(func.max(Building.version)).scalar_subquery(),
+            select(func.max(ChangeTombstone.version)).scalar_subquery(),
+        )
+    )
+    return tuple(result.one())
+
+
+async def load_geo_index() -> BuildingGeoIndex:
+    ids, latitudes, longitudes = [], [], []
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            select(Building.id, Building.latitude, Building.longitude).execution_options(
+                yield_per=GEO_INDEX_LOAD_BATCH
+            )
+        )
+        async for partition in result.partitions():
+            batch = await asyncio.to_thread(
+                lambda: np.array(partition, dtype=np.float64).reshape(-1, 3)
+            )
+            ids.append(batch[:, 0])
+            latitudes.append(batch[:, 1])
+            longitudes.append(batch[:, 2])
+    if not ids:
+        return BuildingGeoIndex([], [], [])
+    # Sorting into the grid takes a while for millions of buildings; requests
+    # keep being served from the previous index meanwhile.
+    return await asyncio.to_thread(
+        lambda: BuildingGeoIndex(
+            np.concatenate(ids), np.concatenate(latitudes), np.concatenate(longitudes)
+        )
+    )
+
+
+async def maintain_geo_index():
+    """Build the index and rebuild it whenever buildings change, detected by
+    polling the newest building version and tombstone every
+    GEO_INDEX_REFRESH_SECONDS."""
+    global _geo_index
+    if np is None:
+        logger.warning("GEO_INDEX_ENABLED is set but numpy is not installed")
+        return
+    loaded_state = None
+    while True:
+        try:
+            async with engine.connect() as conn:
+                state = await _buildings_state(conn)
+            if state != loaded_state:
+                _geo_index = await load_geo_index()
+                loaded_state = state
+                logger.info(
+                    "Loaded geo index: %d buildings, %.1f MiB",
+                    len(_geo_index),
+                    _geo_index.nbytes / 2**20,
+                )
+        except Exception:
+            logger.exception("Failed to refresh the geo index")
+        await asyncio.sleep(GEO_INDEX_REFRESH_SECONDS)
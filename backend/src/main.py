@@ -1,11 +1,76 @@
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from src.routers.api import router
-from src.routers import organizations, buildings, activities
+from src.routers import organizations, buildings, activities, changes, snapshots, batch
+from src.warmup import warmup, startup_state
+from src.encoding import EncodingMiddleware
+from src.singleflight import SingleFlightMiddleware, get_coalescing_stats
+from src.geo_index import GEO_INDEX_ENABLED, maintain_geo_index
+from src.snapshots import SNAPSHOTS_ENABLED, maintain_snapshots
+
+startup_state["import_seconds"] = time.perf_counter() - _import_started
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [asyncio.create_task(warmup())]
+    if GEO_INDEX_ENABLED:
+        tasks.append(asyncio.create_task(maintain_geo_index()))
+    if SNAPSHOTS_ENABLED:
+        tasks.append(asyncio.create_task(maintain_snapshots()))
+    yield
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router, prefix="/api")
 
+app.add_middleware(SingleFlightMiddleware)
+app.add_middleware(EncodingMiddleware)
+
+
+@app.middleware("http")
+async def measure_first_request(request: Request, call_next):
+    if startup_state["first_request_seconds"] is not None or not (
+        request.url.path.startswith("/api")
+    ):
+        return await call_next(request)
+    started = time.perf_counter()
+    response = await call_next(request)
+    if startup_state["first_request_seconds"] is None:
+        startup_state["first_request_seconds"] = time.perf_counter() - started
+    return response
+
+
 @app.get("/")
 async def index():
-    return "Application is working\n"
\ No newline at end of file
+    return "Application is working\n"
+
+
+@app.get("/ready")
+async def ready():
+    return JSONResponse(
+        status_code=(
+            status.HTTP_200_OK
+            if startup_state["ready"]
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+        content=startup_state,
+    )
+
+
+@app.get("/stats/coalescing")
+async def coalescing_stats():
+    return get_coalescing_stats()
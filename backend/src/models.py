@@ -1,12 +1,33 @@
 from __future__ import annotations
 import sqlalchemy
 
+from datetime import datetime
 from typing import Optional, List
 from src.database import Base
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Float, ForeignKey, Table, Column, Index, func
+from sqlalchemy import String, Float, Integer, BigInteger, Boolean, DateTime, ForeignKey, Table, Column, Index, Sequence, Computed, func, false
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 
-class Building(Base):
+change_version_seq = Sequence("change_version_seq", metadata=Base.metadata)
+
+# Id of the writing transaction, see change_feed_trigger.CURRENT_XACT_ID. Only
+# the change feed reads it, so it is not loaded with the entities.
+_current_xact_id = sqlalchemy.text("(pg_current_xact_id()::text::bigint)")
+
+# version, xact_id and updated_at are assigned by the track_row_version trigger
+# on every insert and update (see src/scripts/change_feed_trigger.py)
+class ChangeTracked:
+    version: Mapped[int] = mapped_column(
+        BigInteger, server_default=change_version_seq.next_value(), index=True
+    )
+    xact_id: Mapped[int] = mapped_column(
+        BigInteger, server_default=_current_xact_id, deferred=True
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.clock_timestamp()
+    )
+
+class Building(ChangeTracked, Base):
     __tablename__ = "buildings"
     id: Mapped[int] = mapped_column(primary_key=True)
     address: Mapped[str] = mapped_column(String(255), unique=True)
@@ -27,7 +48,7 @@ org_act_assoc = Table(
     Index("ix_org_act_activity_id", "activity_id"),
 )
 
-class Organization(Base):
+class Organization(ChangeTracked, Base):
     __tablename__ = "organizations"
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255), unique=True)
@@ -41,16 +62,23 @@ class Organization(Base):
         Index("ix_organization_name_lower", func.lower(name)),
     )
 
-class OrganizationPhones(Base):
+class OrganizationPhones(ChangeTracked, Base):
     __tablename__ = "organization_phones"
     id: Mapped[int] = mapped_column(primary_key=True)
     number: Mapped[str] = mapped_column(String(50), unique=True)
+    # Digits of the number, for lookups independent of formatting. The "C"
+    # collation lets the B-tree index serve prefix range scans.
+    number_normalized: Mapped[str] = mapped_column(
+        String(50, collation="C"),
+        Computed(r"regexp_replace(number, '\D', '', 'g')", persisted=True),
+        index=True,
+    )
     organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id", ondelete="CASCADE"), index=True)
     
     organization: Mapped[Organization] = relationship(back_populates="phones", passive_deletes=True)
 
 
-class Activity(Base):
+class Activity(ChangeTracked, Base):
     __tablename__ = "activities"
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50), unique=True)
@@ -67,3 +95,77 @@ class Activity(Base):
     )
     organizations: Mapped[List[Organization]] = relationship(secondary=org_act_assoc, back_populates="activities", passive_deletes=True)
 
+
+class ApiKey(Base):
+    __tablename__ = "api_keys"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    key_hash: Mapped[str] = mapped_column(String(64), unique=True)
+    tenant: Mapped[str] = mapped_column(String(100))
+    scopes: Mapped[List[str]] = mapped_column(ARRAY(String(50)), server_default="{}")
+    revoked: Mapped[bool] = mapped_column(Boolean, server_default=false())
+
+rate_limit_buckets = Table(
+    "rate_limit_buckets",
+    Base.metadata,
+    Column("key", String(64), primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("allowed", Boolean, nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+    prefixes=["UNLOGGED"],
+)
+
+
+# Prerendered OrganizationReadSchema documents, kept in sync by the triggers
+# in src/scripts/organization_documents_trigger.py
+class OrganizationDocument(Base):
+    __tablename__ = "organization_documents"
+    organization_id: Mapped[int] = mapped_column(
+        ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True
+    )
+    building_id: Mapped[int] = mapped_column(Integer, index=True)
+    latitude: Mapped[float] = mapped_column(Float)
+    longitude: Mapped[float] = mapped_column(Float)
+    activity_ids: Mapped[List[int]] = mapped_column(ARRAY(Integer))
+    document: Mapped[dict] = mapped_column(JSONB)
+
+    __table_args__ = (
+        Index("ix_organization_documents_lat_lon", "latitude", "longitude"),
+        Index("ix_organization_documents_activity_ids", "activity_ids", postgresql_using="gin"),
+    )
+
+
+# Organizations per activity, directly and across its branch, kept in sync by
+# the triggers in src/scripts/activity_counts_trigger.py
+class ActivityOrganizationCount(Base):
+    __tablename__ = "activity_organization_counts"
+    activity_id: Mapped[int] = mapped_column(
+        ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True
+    )
+    direct_count: Mapped[int] = mapped_column(Integer, server_default="0")
+    branch_count: Mapped[int] = mapped_column(Integer, server_default="0")
+
+
+class ChangeTombstone(Base):
+    __tablename__ = "change_tombstones"
+    version: Mapped[int] = mapped_column(
+        BigInteger, server_default=change_version_seq.next_value(), primary_key=True
+    )
+    xact_id: Mapped[int] = mapped_column(
+        BigInteger, server_default=_current_xact_id, deferred=True
+    )
+    entity: Mapped[str] = mapped_column(String(50))
+    entity_id: Mapped[int] = mapped_column(Integer)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.clock_timestamp()
+    )
+
+    __table_args__ = (
+        Index("ix_change_tombstones_xact_id_version", "xact_id", "version"),
+    )
+
+
+# The change feed pages through every tracked table in (xact_id, version) order.
+for _model in (Building, Organization, OrganizationPhones, Activity):
+    Index(
+        f"ix_{_model.__tablename__}_xact_id_version", _model.xact_id, _model.version
+    )
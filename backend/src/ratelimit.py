@@ -0,0 +1,145 @@
+import asyncio
+import math
+import os
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.database import rate_limit_engine
+from src.security import ApiKeyInfo, verify_api_key
+
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+
+DEFAULT_ROUTE_CONCURRENCY = int(os.getenv("DEFAULT_ROUTE_CONCURRENCY", "32"))
+ROUTE_QUEUE_TIMEOUT = float(os.getenv("ROUTE_QUEUE_TIMEOUT", "0.5"))
+
+
+def _parse_route_limits(value: str) -> dict[str, int]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        path, limit = item.rsplit("=", 1)
+        limits[path] = int(limit)
+    return limits
+
+
+# Route paths relative to the /api prefix.
+ROUTE_CONCURRENCY_LIMITS = _parse_route_limits(
+    os.getenv(
+        "ROUTE_CONCURRENCY_LIMITS",
+        "/organizations/in_radius/=4,"
+        "/organizations/in_radius/batch=4,"
+        "/organizations/in_rectangle/=4,"
+        "/buildings/in_radius/=4,"
+        "/buildings/in_rectangle/=4,"
+        "/buildings/in_polygon=4,"
+        "/organizations/in_polygon=4,"
+        "/organizations/facets=4",
+    )
+)
+
+
+class InMemoryBucketStore:
+    """Token buckets kept in the worker process."""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+
+class PostgresBucketStore:
+    """Token buckets shared by every worker through an UNLOGGED table in the
+    application database; refill and take happen in a single upsert."""
+
+    _TAKE = text(
+        """
+        INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+        VALUES (:key, :burst - 1, true, clock_timestamp())
+        ON CONFLICT (key) DO UPDATE SET
+            allowed = LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate) >= 1,
+            tokens = LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate)
+                - CASE WHEN LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * :rate) >= 1
+                    THEN 1 ELSE 0 END,
+            updated_at = clock_timestamp()
+        RETURNING allowed, tokens
+        """
+    )
+
+    async def take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        try:
+            async with rate_limit_engine.begin() as conn:
+                result = await conn.execute(
+                    self._TAKE, {"key": key, "rate": rate, "burst": burst}
+                )
+                allowed, tokens = result.one()
+        except PoolTimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent requests",
+                headers={"Retry-After": "1"},
+            )
+        return allowed, tokens
+
+
+bucket_store = (
+    PostgresBucketStore() if RATE_LIMIT_STORE == "postgres" else InMemoryBucketStore()
+)
+
+
+async def take_token(key_hash: str):
+    """Charge one request to the bucket of ``key_hash``, raising 429 when it is
+    empty."""
+    allowed, tokens = await bucket_store.take(
+        key_hash, RATE_LIMIT_RATE, RATE_LIMIT_BURST
+    )
+    if not allowed:
+        retry_after = math.ceil((1 - tokens) / RATE_LIMIT_RATE)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(retry_after, 1))},
+        )
+
+
+async def rate_limit(api_key: ApiKeyInfo = Depends(verify_api_key)):
+    await take_token(api_key.key_hash)
+
+
+_route_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+async def limit_concurrency(request: Request):
+    """Bound the number of in-flight requests per route. Requests that cannot be
+    admitted within ROUTE_QUEUE_TIMEOUT fail fast with 503 instead of queueing
+    on the connection pool."""
+    # Depending on the FastAPI version included routes carry the prefix or not.
+    path = request.scope["route"].path.removeprefix("/api")
+    semaphore = _route_semaphores.get(path)
+    if semaphore is None:
+        semaphore = _route_semaphores[path] = asyncio.Semaphore(
+            ROUTE_CONCURRENCY_LIMITS.get(path, DEFAULT_ROUTE_CONCURRENCY)
+        )
+    try:
+        await asyncio.wait_for(semaphore.acquire(), ROUTE_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent requests",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -1,7 +1,7 @@
 from fastapi import Depends, Query, Path, HTTPException
-from src.schemas import *
+from src.schemas import ActivityBaseReadSchema, ActivityTreeReadSchema
 from src.database import get_db
-from src.models import *
+from src.models import Activity, ActivityOrganizationCount
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, asc
 from sqlalchemy.orm import selectinload
@@ -9,16 +9,50 @@ from sqlalchemy.orm import selectinload
 from src.routers.api import router, DEFAULT_LIMIT, MAX_LIMIT
 
 
+WITH_COUNTS_DESCRIPTION = (
+    "Add direct_count and branch_count (organizations in the activity and in "
+    "its whole branch)"
+)
+
+
+def _walk_tree(activity: Activity):
+    yield activity
+    for child in activity.children:
+        yield from _walk_tree(child)
+
+
+async def attach_organization_counts(session: AsyncSession, activities) -> None:
+    """Set direct_count and branch_count on the given activities, read from the
+    precomputed activity_organization_counts table."""
+    activities = list(activities)
+    result = await session.execute(
+        select(ActivityOrganizationCount).where(
+            ActivityOrganizationCount.activity_id.in_(
+                [activity.id for activity in activities]
+            )
+        )
+    )
+    counts = {count.activity_id: count for count in result.scalars()}
+    for activity in activities:
+        count = counts.get(activity.id)
+        activity.direct_count = count.direct_count if count else 0
+        activity.branch_count = count.branch_count if count else 0
+
+
 @router.get("/activities", response_model=list[ActivityBaseReadSchema])
 async def read_activities(
     session: AsyncSession = Depends(get_db),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    with_counts: bool = Query(False, description=WITH_COUNTS_DESCRIPTION),
 ):
     result = await session.execute(
         select(Activity).order_by(asc(Activity.id)).offset(offset).limit(limit)
     )
-    return result.unique().scalars().all()
+    activities = result.unique().scalars().all()
+    if with_counts and activities:
+        await attach_organization_counts(session, activities)
+    return activities
 
 
 @router.get("/activities/{activity_id}", response_model=ActivityTreeReadSchema)
@@ -27,6 +61,7 @@ async def read_activity(
     activity_id: int = Path(
         ..., gt=0, description="The ID of the activity to retrieve"
     ),
+    with_counts: bool = Query(False, description=WITH_COUNTS_DESCRIPTION),
 ):
     result = await session.execute(
         select(Activity)
@@ -41,4 +76,6 @@ async def read_activity(
     activity = result.scalars().first()
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
+    if with_counts:
+        await attach_organization_counts(session, _walk_tree(activity))
     return activity
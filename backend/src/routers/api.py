@@ -1,14 +1,29 @@
-from fastapi import APIRouter, Depends
+import math
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
 from src.security import verify_api_key
-from src.schemas import *
-from src.models import *
-from sqlalchemy import func
+from src.ratelimit import rate_limit, limit_concurrency
+from src.models import Building
+from sqlalchemy import String, any_, cast, false, func, literal, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import UserDefinedType
 
-router = APIRouter(dependencies=[Depends(verify_api_key)])
+# Admission control runs before the rate limiter, whose shared store may cost a
+# database round trip.
+router = APIRouter(
+    dependencies=[
+        Depends(verify_api_key),
+        Depends(limit_concurrency),
+        Depends(rate_limit),
+    ]
+)
 
 DEFAULT_LIMIT = 10
 MAX_LIMIT = 100
 
+POLYGON_MAX_VERTICES = int(os.getenv("POLYGON_MAX_VERTICES", "20000"))
+
 
 EARTH_RADIUS = 6371
 
@@ -23,3 +38,113 @@ def get_haversine_distance_expression(central_lat: float, central_lon: float):
     )
     in_borders = func.least(func.greatest(inner, -1.0), 1.0)
     return EARTH_RADIUS * func.acos(in_borders)
+
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+# Half of the circumference: a circle of this radius covers the whole globe.
+MAX_RADIUS_KM = math.pi * EARTH_RADIUS
+
+
+def get_rectangle_bounds(
+    latitude: float, longitude: float, width: float, height: float
+) -> tuple[float, float, float, float]:
+    return (
+        latitude - (height / 2),
+        latitude + (height / 2),
+        longitude - (width / 2),
+        longitude + (width / 2),
+    )
+
+
+def get_bounding_box(
+    central_lat: float, central_lon: float, radius_km: float
+) -> tuple[float, float, float, float]:
+    """Latitude/longitude box enclosing the circle, usable as an index-friendly
+    prefilter for the haversine condition. Falls back to the full longitude
+    range near the poles and when the circle crosses the antimeridian."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat = max(central_lat - lat_delta, -90.0)
+    max_lat = min(central_lat + lat_delta, 90.0)
+    max_abs_lat = max(abs(min_lat), abs(max_lat))
+    if max_abs_lat >= 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    lon_delta = lat_delta / math.cos(math.radians(max_abs_lat))
+    if central_lon - lon_delta < -180.0 or central_lon + lon_delta > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, central_lon - lon_delta, central_lon + lon_delta
+
+
+def get_bounds_condition(bounds: tuple[float, float, float, float]):
+    min_lat, max_lat, min_lon, max_lon = bounds
+    return (
+        Building.latitude.between(min_lat, max_lat)
+        & Building.longitude.between(min_lon, max_lon)
+    )
+
+
+class PolygonType(UserDefinedType):
+    """PostgreSQL's built-in geometric ``polygon``."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "polygon"
+
+
+def _ring_text(ring: list[list[float]]) -> str:
+    # polygon input syntax, with longitude as x and latitude as y.
+    return "(" + ",".join(f"({lon!r},{lat!r})" for lon, lat, *_ in ring) + ")"
+
+
+def _validate_polygons(polygons: list) -> None:
+    vertices = 0
+    for rings in polygons:
+        for ring in rings:
+            vertices += len(ring)
+            for lon, lat, *_ in ring:
+                if not (-180.0 <= lon <= 180.0 and -90.0 <= lat <= 90.0):
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Position [{lon}, {lat}] is out of range.",
+                    )
+    if vertices > POLYGON_MAX_VERTICES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Polygon has {vertices} vertices, at most "
+            f"{POLYGON_MAX_VERTICES} are allowed.",
+        )
+
+
+def get_polygon_bounds(ring: list[list[float]]) -> tuple[float, float, float, float]:
+    longitudes = [position[0] for position in ring]
+    latitudes = [position[1] for position in ring]
+    return min(latitudes), max(latitudes), min(longitudes), max(longitudes)
+
+
+def get_polygon_condition(geometry):
+    """Buildings inside a GeoJSON Polygon or MultiPolygon. Every polygon is
+    prefiltered by the bounding box of its exterior ring (ix_buildings_lat_lon),
+    and only those candidates get the exact ``point <@ polygon`` test, which
+    excludes its holes. Polygons crossing the antimeridian must be split, as
+    GeoJSON recommends."""
+    polygons = (
+        [geometry.coordinates] if geometry.type == "Polygon" else geometry.coordinates
+    )
+    _validate_polygons(polygons)
+    point = func.point(Building.longitude, Building.latitude)
+    conditions = []
+    for exterior, *holes in polygons:
+        condition = get_bounds_condition(get_polygon_bounds(exterior)) & point.op(
+            "<@", is_comparison=True
+        )(cast(literal(_ring_text(exterior), String), PolygonType()))
+        if holes:
+            condition &= ~point.op("<@", is_comparison=True)(
+                any_(
+                    cast(
+                        literal([_ring_text(hole) for hole in holes], ARRAY(String)),
+                        ARRAY(PolygonType()),
+                    )
+                )
+            )
+        conditions.append(condition)
+    return or_(false(), *conditions)
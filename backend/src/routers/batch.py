@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import os
+from urllib.parse import unquote, urlsplit
+
+from fastapi import Depends, HTTPException, Request
+from starlette.datastructures import Headers
+
+from src.routers.api import router
+from src.schemas import (
+    BatchQuerySchema,
+    BatchReadSchema,
+    BatchSubRequestSchema,
+    BatchSubResponseSchema,
+)
+from src.security import ApiKeyInfo, verify_api_key
+
+logger = logging.getLogger("uvicorn.error")
+
+# Sub-requests of one batch running at the same time, each on its own session.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+BATCH_PATH = "/batch"
+
+
+async def dispatch(
+    request: Request, api_key: ApiKeyInfo, sub_request: BatchSubRequestSchema
+) -> BatchSubResponseSchema:
+    """Run one sub-request through the application in process, as if it had
+    arrived on its own, and collect its response."""
+    url = urlsplit(sub_request.url)
+    body = b"" if sub_request.body is None else json.dumps(sub_request.body).encode()
+    headers = [(b"accept", b"application/json")]
+    if sub_request.body is not None:
+        headers.append((b"content-type", b"application/json"))
+    # Kept so the sub-request coalesces only with requests of the same tenant.
+    if "x-api-key" in request.headers:
+        headers.append((b"x-api-key", request.headers["x-api-key"].encode()))
+    scope = {
+        "type": "http",
+        "asgi": request.scope["asgi"],
+        "http_version": request.scope["http_version"],
+        "method": sub_request.method,
+        "scheme": request.scope["scheme"],
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": "/api" + unquote(url.path),
+        "raw_path": ("/api" + url.path).encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        # verify_api_key takes the key from here instead of resolving it again.
+        "state": {**request.scope.get("state", {}), "batch_api_key": api_key},
+    }
+
+    finished = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    start = None
+    chunks = []
+
+    async def send(message):
+        nonlocal start
+        if message["type"] == "http.response.start":
+            start = message
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # The error middleware re-raises after sending its 500; the other
+        # sub-requests of the batch still get their responses.
+        logger.exception(
+            "Batch sub-request %s %s failed", sub_request.method, url.path
+        )
+        start = None
+    finally:
+        finished.set()
+
+    if start is None:
+        return BatchSubResponseSchema(
+            id=sub_request.id,
+            status=500,
+            body={"detail": "Internal Server Error"},
+        )
+
+    response_headers = Headers(raw=start["headers"])
+    content = b"".join(chunks)
+    return BatchSubResponseSchema(
+        id=sub_request.id,
+        status=start["status"],
+        headers=dict(response_headers),
+        body=(
+            json.loads(content)
+            if content
+            and response_headers.get("content-type", "").startswith("application/json")
+            else None
+        ),
+    )
+
+
+@router.post(BATCH_PATH, response_model=BatchReadSchema)
+async def read_batch(
+    query: BatchQuerySchema,
+    request: Request,
+    api_key: ApiKeyInfo = Depends(verify_api_key),
+):
+    """Run up to 50 sub-requests to other endpoints concurrently (at most
+    BATCH_CONCURRENCY at a time) and return their responses in request order.
+    The API key is verified once for the whole batch; rate limits and per-route
+    concurrency limits still apply to every sub-request."""
+    for sub_request in query.requests:
+        path = unquote(urlsplit(sub_request.url).path)
+        if path.rstrip("/") == BATCH_PATH:
+            raise HTTPException(status_code=422, detail="Batches cannot be nested.")
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(sub_request: BatchSubRequestSchema) -> BatchSubResponseSchema:
+        async with semaphore:
+            return await dispatch(request, api_key, sub_request)
+
+    responses = await asyncio.gather(
+        *(run(sub_request) for sub_request in query.requests)
+    )
+    return BatchReadSchema(responses=responses)
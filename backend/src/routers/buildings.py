@@ -1,26 +1,44 @@
-from fastapi import Depends, Query, Path, HTTPException
-from src.schemas import *
+from fastapi import Depends, Query, Path, HTTPException, Response
+from typing import List
+from src.schemas import BuildingReadSchema, GeoJsonAreaSchema
 from src.database import get_db
-from src.models import *
+from src.models import Building
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, asc
 
+from src.cost import guard_query_cost, decision_session
+from src.total_count import CountRequest, get_count_request, set_total_count
+from src.geo_index import (
+    count_in_thread,
+    get_geo_index,
+    ids_condition,
+    search_in_thread,
+)
 from src.routers.api import (
     router,
     DEFAULT_LIMIT,
     MAX_LIMIT,
+    MAX_RADIUS_KM,
     get_haversine_distance_expression,
+    get_bounding_box,
+    get_rectangle_bounds,
+    get_bounds_condition,
+    get_polygon_condition,
 )
 
 
 @router.get("/buildings", response_model=list[BuildingReadSchema])
 async def read_buildings(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    count_request: CountRequest | None = Depends(get_count_request),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
 ):
+    stmt = select(Building)
+    await set_total_count(session, response, count_request, stmt)
     result = await session.execute(
-        select(Building).order_by(asc(Building.id)).offset(offset).limit(limit)
+        stmt.order_by(asc(Building.id)).offset(offset).limit(limit)
     )
     return result.scalars().all()
 
@@ -39,52 +57,157 @@ async def read_building(
     return building
 
 
+async def _read_buildings_by_ids(session: AsyncSession, building_ids):
+    result = await session.execute(
+        select(Building)
+        .where(ids_condition(Building.id, building_ids))
+        .order_by(asc(Building.id))
+    )
+    return result.scalars().all()
+
+
 @router.get("/buildings/in_radius/", response_model=List[BuildingReadSchema])
 async def read_buildings_in_radius(
+    response: Response,
     session: AsyncSession = Depends(get_db),
-    latitude: float = Query(..., description="Latitude of the center point"),
-    longitude: float = Query(..., description="Longitude of the center point"),
-    radius_km: float = Query(..., gt=0, description="Radius in kilometers"),
+    count_request: CountRequest | None = Depends(get_count_request),
+    latitude: float = Query(
+        ..., ge=-90, le=90, description="Latitude of the center point"
+    ),
+    longitude: float = Query(
+        ..., ge=-180, le=180, description="Longitude of the center point"
+    ),
+    radius_km: float = Query(
+        ..., gt=0, le=MAX_RADIUS_KM, description="Radius in kilometers"
+    ),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
 ):
+    geo_index = get_geo_index()
+    if geo_index is not None:
+        decision = await guard_query_cost(
+            session,
+            response,
+            lambda scale: count_in_thread(
+                geo_index.in_radius, latitude, longitude, radius_km * scale
+            ),
+        )
+        building_ids = await search_in_thread(
+            geo_index.in_radius, latitude, longitude, radius_km * decision.scale
+        )
+        await set_total_count(
+            session, response, count_request, total=len(building_ids)
+        )
+        async with decision_session(decision, session) as query_session:
+            return await _read_buildings_by_ids(
+                query_session, building_ids[offset : offset + limit]
+            )
+
+    decision = await guard_query_cost(
+        session,
+        response,
+        lambda scale: select(Building.id).where(
+            get_bounds_condition(
+                get_bounding_box(latitude, longitude, radius_km * scale)
+            )
+        ),
+    )
+    radius_km *= decision.scale
+
     haversine_distance_expression = get_haversine_distance_expression(
         latitude, longitude
     )
 
-    result = await session.execute(
-        select(Building)
-        .where(haversine_distance_expression <= radius_km)
-        .offset(offset)
-        .limit(limit)
+    stmt = select(Building).where(
+        get_bounds_condition(get_bounding_box(latitude, longitude, radius_km)),
+        haversine_distance_expression <= radius_km,
     )
-    buildings = result.scalars().all()
+    async with decision_session(decision, session) as query_session:
+        await set_total_count(query_session, response, count_request, stmt)
+        result = await query_session.execute(stmt.offset(offset).limit(limit))
+        buildings = result.scalars().all()
     return buildings
 
 
 @router.get("/buildings/in_rectangle/", response_model=List[BuildingReadSchema])
 async def read_buildings_in_rectangle(
+    response: Response,
     session: AsyncSession = Depends(get_db),
-    latitude: float = Query(..., description="Latitude of the center point"),
-    longitude: float = Query(..., description="Longitude of the center point"),
-    width: float = Query(..., gt=0, description="Rectangle width in degrees"),
-    height: float = Query(..., gt=0, description="Rectangle height in degrees"),
+    count_request: CountRequest | None = Depends(get_count_request),
+    latitude: float = Query(
+        ..., ge=-90, le=90, description="Latitude of the center point"
+    ),
+    longitude: float = Query(
+        ..., ge=-180, le=180, description="Longitude of the center point"
+    ),
+    width: float = Query(
+        ..., gt=0, le=360, description="Rectangle width in degrees"
+    ),
+    height: float = Query(
+        ..., gt=0, le=180, description="Rectangle height in degrees"
+    ),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
 ):
-    min_latitude = latitude - (height / 2)
-    max_latitude = latitude + (height / 2)
-    min_longitude = longitude - (width / 2)
-    max_longitude = longitude + (width / 2)
-
-    result = await session.execute(
-        select(Building)
-        .where(
-            Building.latitude.between(min_latitude, max_latitude),
-            Building.longitude.between(min_longitude, max_longitude),
+    geo_index = get_geo_index()
+    if geo_index is not None:
+        decision = await guard_query_cost(
+            session,
+            response,
+            lambda scale: count_in_thread(
+                geo_index.in_rectangle,
+                get_rectangle_bounds(
+                    latitude, longitude, width * scale, height * scale
+                ),
+            ),
+        )
+        building_ids = await search_in_thread(
+            geo_index.in_rectangle,
+            get_rectangle_bounds(
+                latitude, longitude, width * decision.scale, height * decision.scale
+            ),
         )
-        .offset(offset)
-        .limit(limit)
+        await set_total_count(
+            session, response, count_request, total=len(building_ids)
+        )
+        async with decision_session(decision, session) as query_session:
+            return await _read_buildings_by_ids(
+                query_session, building_ids[offset : offset + limit]
+            )
+
+    decision = await guard_query_cost(
+        session,
+        response,
+        lambda scale: select(Building.id).where(
+            get_bounds_condition(
+                get_rectangle_bounds(latitude, longitude, width * scale, height * scale)
+            )
+        ),
     )
-    buildings = result.scalars().all()
+    width *= decision.scale
+    height *= decision.scale
+
+    stmt = select(Building).where(
+        get_bounds_condition(get_rectangle_bounds(latitude, longitude, width, height))
+    )
+    async with decision_session(decision, session) as query_session:
+        await set_total_count(query_session, response, count_request, stmt)
+        result = await query_session.execute(stmt.offset(offset).limit(limit))
+        buildings = result.scalars().all()
     return buildings
+
+
+@router.post("/buildings/in_polygon", response_model=List[BuildingReadSchema])
+async def read_buildings_in_polygon(
+    area: GeoJsonAreaSchema,
+    response: Response,
+    session: AsyncSession = Depends(get_db),
+    count_request: CountRequest | None = Depends(get_count_request),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+):
+    """Buildings inside a GeoJSON Polygon or MultiPolygon (holes excluded)."""
+    stmt = select(Building).where(get_polygon_condition(area))
+    await set_total_count(session, response, count_request, stmt)
+    result = await session.execute(stmt.offset(offset).limit(limit))
+    return result.scalars().all()
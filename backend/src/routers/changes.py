@@ -0,0 +1,149 @@
+from fastapi import Depends, Query, HTTPException
+from src.schemas import ChangesPageSchema
+from src.database import get_db
+from src.models import (
+    Activity,
+    Building,
+    ChangeTombstone,
+    Organization,
+    OrganizationPhones,
+    org_act_assoc,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    BigInteger,
+    Text,
+    cast,
+    false,
+    func,
+    literal,
+    null,
+    select,
+    true,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
+
+from src.routers.api import router
+
+CHANGES_DEFAULT_LIMIT = 100
+CHANGES_MAX_LIMIT = 1000
+
+# Versions come from a sequence, so a transaction that is still open can commit
+# a version lower than one already visible. The feed is therefore ordered by
+# the id of the writing transaction first and only emits changes of
+# transactions older than every one still running: any change that becomes
+# visible later sorts after the returned token. A transaction left open holds
+# the feed back until it ends, instead of its changes being skipped.
+_TRACKED_MODELS = (Building, Organization, OrganizationPhones, Activity)
+
+# Transaction ids and versions are bigint; larger tokens were never issued.
+_MAX_POSITION = 2**63 - 1
+
+
+def _parse_token(since: str | None) -> tuple[int, int]:
+    """``<xact_id>:<version>`` of the last change a client has seen."""
+    if since is None:
+        return 0, 0
+    try:
+        xact_id, version = (int(part) for part in since.split(":"))
+    except ValueError:
+        xact_id = version = -1
+    if not (0 <= xact_id <= _MAX_POSITION and 0 <= version <= _MAX_POSITION):
+        raise HTTPException(status_code=400, detail="Invalid change token.")
+    return xact_id, version
+
+
+def _row_data(model):
+    data = func.to_jsonb(model.__table__.table_valued())
+    if model is Organization:
+        # Activity links have no row of their own in the feed (changing
+        # them bumps the organization's version), so they travel here.
+        activity_ids = (
+            select(
+                func.jsonb_agg(
+                    aggregate_order_by(
+                        org_act_assoc.c.activity_id, org_act_assoc.c.activity_id
+                    )
+                )
+            )
+            .where(org_act_assoc.c.organization_id == Organization.id)
+            .scalar_subquery()
+        )
+        data = data.op("||", return_type=JSONB)(
+            func.jsonb_build_object(
+                "activity_ids", func.coalesce(activity_ids, func.jsonb_build_array())
+            )
+        )
+    return data
+
+
+@router.get("/changes", response_model=ChangesPageSchema)
+async def read_changes(
+    session: AsyncSession = Depends(get_db),
+    since: str | None = Query(
+        None, description="Token returned by the previous call, omit for a full sync"
+    ),
+    limit: int = Query(CHANGES_DEFAULT_LIMIT, ge=1, le=CHANGES_MAX_LIMIT),
+):
+    since_position = tuple_(*_parse_token(since))
+    # Transactions below the snapshot's xmin have all ended.
+    visible_before = await session.scalar(
+        select(
+            cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+        )
+    )
+
+    # Every branch reads at most limit + 1 rows through its (xact_id, version)
+    # index.
+    branches = [
+        select(
+            literal(model.__tablename__).label("entity"),
+            model.id.label("id"),
+            model.xact_id.label("xact_id"),
+            model.version.label("version"),
+            false().label("deleted"),
+            _row_data(model).label("data"),
+        )
+        .where(
+            tuple_(model.xact_id, model.version) > since_position,
+            model.xact_id < visible_before,
+        )
+        .order_by(model.xact_id, model.version)
+        .limit(limit + 1)
+        for model in _TRACKED_MODELS
+    ]
+    branches.append(
+        select(
+            ChangeTombstone.entity,
+            ChangeTombstone.entity_id,
+            ChangeTombstone.xact_id,
+            ChangeTombstone.version,
+            true(),
+            null().cast(JSONB),
+        )
+        .where(
+            tuple_(ChangeTombstone.xact_id, ChangeTombstone.version) > since_position,
+            ChangeTombstone.xact_id < visible_before,
+        )
+        .order_by(ChangeTombstone.xact_id, ChangeTombstone.version)
+        .limit(limit + 1)
+    )
+    changes = union_all(*branches).subquery("changes")
+
+    result = await session.execute(
+        select(changes)
+        .order_by(changes.c.xact_id, changes.c.version)
+        .limit(limit + 1)
+    )
+    rows = result.mappings().all()
+    page = rows[:limit]
+
+    return {
+        "changes": page,
+        "next_token": (
+            f"{page[-1]['xact_id']}:{page[-1]['version']}" if page else since or "0:0"
+        ),
+        "has_more": len(rows) > limit,
+    }
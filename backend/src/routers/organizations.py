@@ -1,57 +1,381 @@
-from fastapi import Depends, Query, Path, HTTPException
-from src.schemas import *
+import os
+import re
+from functools import lru_cache
+
+from fastapi import Depends, Query, Path, HTTPException, Response
+from pydantic import TypeAdapter
+from typing import List
+from src.schemas import (
+    OrganizationReadSchema,
+    ActivityFacetSchema,
+    GeoJsonAreaSchema,
+    RadiusBatchQuerySchema,
+    RadiusBatchReadSchema,
+    get_partial_organization_schema,
+    get_partial_radius_batch_schema,
+)
 from src.database import get_db
-from src.models import *
+from src.models import (
+    Activity,
+    ActivityOrganizationCount,
+    Building,
+    Organization,
+    OrganizationDocument,
+    OrganizationPhones,
+    org_act_assoc,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, exists, asc, func
-from sqlalchemy.orm import selectinload, joinedload, aliased
-
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    any_,
+    asc,
+    desc,
+    distinct,
+    exists,
+    func,
+    literal,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import selectinload, joinedload, load_only, aliased
+
+from src.cost import guard_query_cost, decision_session
+from src.total_count import CountRequest, get_count_request, set_total_count
+from src.geo_index import (
+    GEO_INDEX_MAX_IDS,
+    count_in_thread,
+    get_geo_index,
+    ids_condition,
+    search_in_thread,
+)
 from src.routers.api import (
     router,
     DEFAULT_LIMIT,
     MAX_LIMIT,
+    MAX_RADIUS_KM,
     get_haversine_distance_expression,
+    get_bounding_box,
+    get_rectangle_bounds,
+    get_bounds_condition,
+    get_polygon_condition,
 )
 
-_ORG_OPTIONS = (
-    joinedload(Organization.building),
-    selectinload(Organization.phones),
-    selectinload(Organization.activities),
-)
+_RELATIONSHIP_OPTIONS = {
+    "building": joinedload(Organization.building),
+    "phones": selectinload(Organization.phones),
+    "activities": selectinload(Organization.activities),
+}
+_ORG_OPTIONS = tuple(_RELATIONSHIP_OPTIONS.values())
+
+# Sparse fieldsets: ``fields`` picks the organization's own columns and
+# ``include`` the related objects to embed.
+ORGANIZATION_FIELDS = ("id", "name")
+ORGANIZATION_RELATIONSHIPS = tuple(_RELATIONSHIP_OPTIONS)
+
+# "live" renders organizations from the normalized tables, "documents" reads
+# the prerendered rows of organization_documents.
+ORGANIZATION_READ_MODEL = os.getenv("ORGANIZATION_READ_MODEL", "live")
+
+
+def normalize_phone_number(number: str) -> str:
+    """Digits of a phone number, matching OrganizationPhones.number_normalized."""
+    return re.sub(r"\D", "", number)
+
+
+def get_phone_number_condition(digits: str, prefix: bool = False):
+    if not prefix:
+        return OrganizationPhones.number_normalized == digits
+    # A range rather than LIKE, so the index is usable with a bound parameter:
+    # the upper bound is the prefix with its last digit incremented.
+    upper_bound = digits[:-1] + chr(ord(digits[-1]) + 1)
+    return (OrganizationPhones.number_normalized >= digits) & (
+        OrganizationPhones.number_normalized < upper_bound
+    )
+
+
+def get_phone_lookup_page(digits: str, prefix: bool, offset: int, limit: int):
+    """Page of organizations with a phone number matching ``digits``. The
+    matching phones are read through the number_normalized index first and
+    only then paged; inlined, the planner walks every phone in organization_id
+    order to satisfy ORDER BY ... LIMIT instead."""
+    matches = (
+        select(OrganizationPhones.organization_id)
+        .where(get_phone_number_condition(digits, prefix))
+        .cte("matches")
+        .prefix_with("MATERIALIZED")
+    )
+    page_ids = (
+        select(matches.c.organization_id)
+        .distinct()
+        .order_by(matches.c.organization_id)
+        .offset(offset)
+        .limit(limit)
+        .subquery("page_ids")
+    )
+    return (
+        select(Organization)
+        .join(page_ids, Organization.id == page_ids.c.organization_id)
+        .order_by(asc(Organization.id))
+    )
+
+
+def _parse_field_names(value: str, allowed: tuple[str, ...], parameter: str) -> set[str]:
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown {parameter}: {', '.join(sorted(unknown))}. "
+            f"Allowed: {', '.join(allowed)}.",
+        )
+    return names
+
+
+def get_fieldset(
+    fields: str | None = Query(
+        None, description="Comma-separated organization fields to return: id, name"
+    ),
+    include: str | None = Query(
+        None,
+        description="Comma-separated related objects to embed: "
+        "building, phones, activities",
+    ),
+) -> frozenset[str] | None:
+    """Top-level fields of the requested organization representation, or None
+    for the full one. ``id`` is always returned."""
+    if fields is None and include is None:
+        return None
+    selected = {"id"}
+    if fields is None:
+        selected.update(ORGANIZATION_FIELDS)
+    else:
+        selected.update(_parse_field_names(fields, ORGANIZATION_FIELDS, "fields"))
+    if include is not None:
+        selected.update(
+            _parse_field_names(include, ORGANIZATION_RELATIONSHIPS, "include")
+        )
+    return frozenset(selected)
+
+
+@lru_cache
+def _partial_adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _render_partial(
+    content, annotation, response: Response | None = None
+) -> Response:
+    # Sparse responses do not fit the route's response model, so they are
+    # serialized here and returned as a ready response, keeping the headers
+    # already set on the endpoint's response.
+    adapter = _partial_adapter(annotation)
+    return Response(
+        adapter.dump_json(adapter.validate_python(content, from_attributes=True)),
+        media_type="application/json",
+        headers=None if response is None else dict(response.headers),
+    )
+
+
+def render_organizations(
+    organizations: list,
+    fieldset: frozenset[str] | None,
+    response: Response | None = None,
+):
+    if fieldset is None:
+        return organizations
+    return _render_partial(
+        organizations, list[get_partial_organization_schema(fieldset)], response
+    )
+
+
+def render_organization(
+    organization,
+    fieldset: frozenset[str] | None,
+    response: Response | None = None,
+):
+    if fieldset is None:
+        return organization
+    return _render_partial(
+        organization, get_partial_organization_schema(fieldset), response
+    )
+
+
+async def fetch_organizations(
+    session: AsyncSession, stmt, fieldset: frozenset[str] | None = None
+) -> list:
+    """Run a ``select(Organization)`` statement built by an endpoint (filters,
+    ordering and paging) and return the page of organizations in the
+    configured read model, loading only what ``fieldset`` asks for."""
+    if ORGANIZATION_READ_MODEL == "documents":
+        document = OrganizationDocument.document
+        if fieldset is not None:
+            # jsonb - text[] drops the keys that were not asked for.
+            document = document.op("-")(
+                literal(
+                    [
+                        name
+                        for name in ORGANIZATION_FIELDS + ORGANIZATION_RELATIONSHIPS
+                        if name not in fieldset
+                    ],
+                    ARRAY(String),
+                )
+            )
+        result = await session.execute(
+            stmt.with_only_columns(document, maintain_column_froms=True).join(
+                OrganizationDocument,
+                OrganizationDocument.organization_id == Organization.id,
+            )
+        )
+        return result.scalars().all()
+    if fieldset is None:
+        options = _ORG_OPTIONS
+    else:
+        options = (
+            load_only(
+                *(
+                    getattr(Organization, name)
+                    for name in ORGANIZATION_FIELDS
+                    if name in fieldset
+                )
+            ),
+            *(
+                option
+                for name, option in _RELATIONSHIP_OPTIONS.items()
+                if name in fieldset
+            ),
+        )
+    result = await session.execute(stmt.options(*options))
+    return result.unique().scalars().all()
+
+
+async def _activity_organization_count(
+    session: AsyncSession, count_request: CountRequest | None, activity_id: int, column
+) -> int | None:
+    # Kept exact by triggers, so activity filters are counted with one lookup.
+    if count_request is None:
+        return None
+    return await session.scalar(
+        select(column).where(ActivityOrganizationCount.activity_id == activity_id)
+    )
 
 
 @router.get("/organizations", response_model=list[OrganizationReadSchema])
 async def read_organizations(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
 ):
+    stmt = select(Organization)
+    await set_total_count(session, response, count_request, stmt)
+    organizations = await fetch_organizations(
+        session,
+        stmt.order_by(asc(Organization.id)).offset(offset).limit(limit),
+        fieldset,
+    )
+    return render_organizations(organizations, fieldset, response)
+
+
+@router.get("/organizations/facets", response_model=list[ActivityFacetSchema])
+async def read_organization_facets(
+    session: AsyncSession = Depends(get_db),
+    latitude: float = Query(
+        ..., ge=-90, le=90, description="Latitude of the center point"
+    ),
+    longitude: float = Query(
+        ..., ge=-180, le=180, description="Longitude of the center point"
+    ),
+    radius_km: float | None = Query(
+        None, gt=0, le=MAX_RADIUS_KM, description="Radius in kilometers"
+    ),
+    width: float | None = Query(
+        None, gt=0, le=360, description="Rectangle width in degrees"
+    ),
+    height: float | None = Query(
+        None, gt=0, le=180, description="Rectangle height in degrees"
+    ),
+    rollup: bool = Query(
+        False, description="Count organizations per root activity of each branch"
+    ),
+):
+    if radius_km is not None and width is None and height is None:
+        area_condition = get_bounds_condition(
+            get_bounding_box(latitude, longitude, radius_km)
+        ) & (get_haversine_distance_expression(latitude, longitude) <= radius_km)
+    elif radius_km is None and width is not None and height is not None:
+        area_condition = get_bounds_condition(
+            get_rectangle_bounds(latitude, longitude, width, height)
+        )
+    else:
+        raise HTTPException(
+            status_code=422, detail="Specify either radius_km or width and height."
+        )
+
+    if rollup:
+        activity_roots = (
+            select(Activity.id, Activity.id.label("root_id"))
+            .where(Activity.parent_id.is_(None))
+            .cte(name="activity_roots", recursive=True)
+        )
+        aliased_activities = aliased(Activity)
+        activity_roots = activity_roots.union_all(
+            select(aliased_activities.id, activity_roots.c.root_id).where(
+                aliased_activities.parent_id == activity_roots.c.id
+            )
+        )
+        facet_id = activity_roots.c.root_id
+        # An organization can have several activities within one branch.
+        organization_count = func.count(distinct(org_act_assoc.c.organization_id))
+        facet_source = org_act_assoc.join(
+            activity_roots, activity_roots.c.id == org_act_assoc.c.activity_id
+        )
+    else:
+        facet_id = org_act_assoc.c.activity_id
+        organization_count = func.count(org_act_assoc.c.organization_id)
+        facet_source = org_act_assoc
+
+    facet_counts = (
+        select(facet_id.label("activity_id"), organization_count.label("count"))
+        .select_from(facet_source)
+        .join(Organization, Organization.id == org_act_assoc.c.organization_id)
+        .join(Building, Building.id == Organization.building_id)
+        .where(area_condition)
+        .group_by(facet_id)
+        .subquery("facet_counts")
+    )
+
     result = await session.execute(
-        select(Organization)
-        .options(*_ORG_OPTIONS)
-        .order_by(asc(Organization.id))
-        .offset(offset)
-        .limit(limit)
+        select(Activity.id, Activity.name, Activity.parent_id, facet_counts.c.count)
+        .join(facet_counts, facet_counts.c.activity_id == Activity.id)
+        .order_by(desc(facet_counts.c.count), asc(Activity.id))
     )
-    return result.scalars().all()
+    return result.mappings().all()
 
 
 @router.get("/organizations/{organization_id}", response_model=OrganizationReadSchema)
 async def read_organization(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
     organization_id: int = Path(
         ..., gt=0, description="The ID of the organization to retrieve"
     ),
 ):
-    result = await session.execute(
-        select(Organization)
-        .options(*_ORG_OPTIONS)
-        .where(Organization.id == organization_id)
+    organizations = await fetch_organizations(
+        session,
+        select(Organization).where(Organization.id == organization_id),
+        fieldset,
     )
-    organization = result.scalars().first()
+    organization = organizations[0] if organizations else None
     if not organization:
         raise HTTPException(status_code=404, detail="Organization not found")
-    return organization
+    return render_organization(organization, fieldset, response)
 
 
 @router.get(
@@ -59,23 +383,24 @@ async def read_organization(
     response_model=list[OrganizationReadSchema],
 )
 async def read_organizations_by_building(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
     building_id: int = Path(
         ..., gt=0, description="The ID of the building to retrieve organization from"
     ),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
 ):
-    result = await session.execute(
-        select(Organization)
-        .options(*_ORG_OPTIONS)
-        .where(Organization.building_id == building_id)
-        .order_by(asc(Organization.id))
-        .offset(offset)
-        .limit(limit)
+    stmt = select(Organization).where(Organization.building_id == building_id)
+    await set_total_count(session, response, count_request, stmt)
+    organizations = await fetch_organizations(
+        session,
+        stmt.order_by(asc(Organization.id)).offset(offset).limit(limit),
+        fieldset,
     )
-    organizations = result.unique().scalars().all()
-    return organizations
+    return render_organizations(organizations, fieldset, response)
 
 
 @router.get(
@@ -83,7 +408,10 @@ async def read_organizations_by_building(
     response_model=list[OrganizationReadSchema],
 )
 async def read_organization_by_activity(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
     activity_id: int = Path(
         ..., gt=0, description="The ID of the activity to retrieve organizations with"
     ),
@@ -102,21 +430,30 @@ async def read_organization_by_activity(
         org_act_assoc.c.activity_id == activity_id,
     )
 
-    result = await session.execute(
-        select(Organization)
-        .where(exists(exists_subquery))
-        .options(*_ORG_OPTIONS)
-        .order_by(asc(Organization.id))
-        .offset(offset)
-        .limit(limit)
+    stmt = select(Organization).where(exists(exists_subquery))
+    await set_total_count(
+        session,
+        response,
+        count_request,
+        stmt,
+        total=await _activity_organization_count(
+            session, count_request, activity_id, ActivityOrganizationCount.direct_count
+        ),
+    )
+    organizations = await fetch_organizations(
+        session,
+        stmt.order_by(asc(Organization.id)).offset(offset).limit(limit),
+        fieldset,
     )
-    organizations = result.scalars().all()
-    return organizations
+    return render_organizations(organizations, fieldset, response)
 
 
 @router.get("/organizations/by_activity/", response_model=list[OrganizationReadSchema])
 async def read_organization_by_activity_name(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
     name: str = Query(
         ...,
         min_length=1,
@@ -137,16 +474,22 @@ async def read_organization_by_activity_name(
         org_act_assoc.c.activity_id == found_activity.id,
     )
 
-    result = await session.execute(
-        select(Organization)
-        .where(exists(exists_subquery))
-        .options(*_ORG_OPTIONS)
-        .order_by(asc(Organization.id))
-        .offset(offset)
-        .limit(limit)
+    stmt = select(Organization).where(exists(exists_subquery))
+    await set_total_count(
+        session,
+        response,
+        count_request,
+        stmt,
+        total=await _activity_organization_count(
+            session, count_request, found_activity.id, ActivityOrganizationCount.direct_count
+        ),
+    )
+    organizations = await fetch_organizations(
+        session,
+        stmt.order_by(asc(Organization.id)).offset(offset).limit(limit),
+        fieldset,
     )
-    organizations = result.scalars().all()
-    return organizations
+    return render_organizations(organizations, fieldset, response)
 
 
 @router.get(
@@ -154,7 +497,10 @@ async def read_organization_by_activity_name(
     response_model=list[OrganizationReadSchema],
 )
 async def read_organization_by_activity_branch(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
     activity_id: int = Path(
         ..., gt=0, description="The ID of the activity to retrieve organizations with"
     ),
@@ -186,23 +532,32 @@ async def read_organization_by_activity_branch(
         org_act_assoc.c.activity_id.in_(select(recursive_cte.c.id)),
     )
 
-    result = await session.execute(
-        select(Organization)
-        .where(exists(exists_subquery))
-        .options(*_ORG_OPTIONS)
-        .order_by(asc(Organization.id))
-        .offset(offset)
-        .limit(limit)
+    stmt = select(Organization).where(exists(exists_subquery))
+    await set_total_count(
+        session,
+        response,
+        count_request,
+        stmt,
+        total=await _activity_organization_count(
+            session, count_request, activity_id, ActivityOrganizationCount.branch_count
+        ),
     )
-    organizations = result.scalars().all()
-    return organizations
+    organizations = await fetch_organizations(
+        session,
+        stmt.order_by(asc(Organization.id)).offset(offset).limit(limit),
+        fieldset,
+    )
+    return render_organizations(organizations, fieldset, response)
 
 
 @router.get(
     "/organizations/by_activity_branch/", response_model=list[OrganizationReadSchema]
 )
 async def read_organization_by_activity_branch_name(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
     name: str = Query(
         ...,
         min_length=1,
@@ -236,104 +591,391 @@ async def read_organization_by_activity_branch_name(
         org_act_assoc.c.activity_id.in_(select(recursive_cte.c.id)),
     )
 
-    result = await session.execute(
-        select(Organization)
-        .where(exists(exists_subquery))
-        .options(*_ORG_OPTIONS)
-        .order_by(asc(Organization.id))
-        .offset(offset)
-        .limit(limit)
+    stmt = select(Organization).where(exists(exists_subquery))
+    await set_total_count(
+        session,
+        response,
+        count_request,
+        stmt,
+        total=await _activity_organization_count(
+            session, count_request, found_activity.id, ActivityOrganizationCount.branch_count
+        ),
+    )
+    organizations = await fetch_organizations(
+        session,
+        stmt.order_by(asc(Organization.id)).offset(offset).limit(limit),
+        fieldset,
     )
-    organizations = result.scalars().all()
-    return organizations
+    return render_organizations(organizations, fieldset, response)
 
 
 @router.get("/organizations/by_name/", response_model=OrganizationReadSchema)
 async def read_organization_by_name(
+    response: Response,
     session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
     name: str = Query(
         ...,
         min_length=1,
         description="Name of the organization to search for",
     ),
 ):
-    result = await session.execute(
-        select(Organization)
-        .options(*_ORG_OPTIONS)
-        .where(func.lower(Organization.name) == func.lower(name))
+    organizations = await fetch_organizations(
+        session,
+        select(Organization).where(func.lower(Organization.name) == func.lower(name)),
+        fieldset,
     )
-    organization = result.scalars().first()
+    organization = organizations[0] if organizations else None
     if not organization:
         raise HTTPException(status_code=404, detail="Organization not found")
-    return organization
+    return render_organization(organization, fieldset, response)
+
+
+@router.get("/organizations/by_phone/", response_model=list[OrganizationReadSchema])
+async def read_organizations_by_phone(
+    response: Response,
+    session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
+    number: str = Query(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="Phone number in any format, only its digits are compared",
+    ),
+    prefix: bool = Query(
+        False, description="Match phone numbers starting with the given digits"
+    ),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+):
+    digits = normalize_phone_number(number)
+    if not digits:
+        raise HTTPException(
+            status_code=422, detail="Phone number must contain digits."
+        )
+    stmt = select(Organization).where(
+        Organization.id.in_(
+            select(OrganizationPhones.organization_id).where(
+                get_phone_number_condition(digits, prefix)
+            )
+        )
+    )
+    await set_total_count(session, response, count_request, stmt)
+    organizations = await fetch_organizations(
+        session, get_phone_lookup_page(digits, prefix, offset, limit), fieldset
+    )
+    return render_organizations(organizations, fieldset, response)
 
 
 @router.get("/organizations/in_radius/", response_model=List[OrganizationReadSchema])
 async def read_organizations_in_radius(
+    response: Response,
     session: AsyncSession = Depends(get_db),
-    latitude: float = Query(..., description="Latitude of the center point"),
-    longitude: float = Query(..., description="Longitude of the center point"),
-    radius_km: float = Query(..., gt=0, description="Radius in kilometers"),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
+    latitude: float = Query(
+        ..., ge=-90, le=90, description="Latitude of the center point"
+    ),
+    longitude: float = Query(
+        ..., ge=-180, le=180, description="Longitude of the center point"
+    ),
+    radius_km: float = Query(
+        ..., gt=0, le=MAX_RADIUS_KM, description="Radius in kilometers"
+    ),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
 ):
+    decision = None
+    geo_index = get_geo_index()
+    if geo_index is not None:
+        decision = await guard_query_cost(
+            session,
+            response,
+            lambda scale: count_in_thread(
+                geo_index.in_radius, latitude, longitude, radius_km * scale
+            ),
+        )
+        building_ids = await search_in_thread(
+            geo_index.in_radius, latitude, longitude, radius_km * decision.scale
+        )
+        if len(building_ids) <= GEO_INDEX_MAX_IDS:
+            stmt = select(Organization).where(
+                ids_condition(Organization.building_id, building_ids)
+            )
+            async with decision_session(decision, session) as query_session:
+                await set_total_count(query_session, response, count_request, stmt)
+                organizations = await fetch_organizations(
+                    query_session, stmt.offset(offset).limit(limit), fieldset
+                )
+            return render_organizations(organizations, fieldset, response)
+
+    if decision is None:
+        decision = await guard_query_cost(
+            session,
+            response,
+            lambda scale: select(Organization.id)
+            .join(Building, Organization.building_id == Building.id)
+            .where(
+                get_bounds_condition(
+                    get_bounding_box(latitude, longitude, radius_km * scale)
+                )
+            ),
+        )
+    radius_km *= decision.scale
+
     haversine_distance_expression = get_haversine_distance_expression(
         latitude, longitude
     )
 
     buildings_in_radius_select = (
         select(Building.id)
-        .where(haversine_distance_expression <= radius_km)
+        .where(
+            get_bounds_condition(get_bounding_box(latitude, longitude, radius_km)),
+            haversine_distance_expression <= radius_km,
+        )
         .subquery("buildings_in_radius")
     )
 
-    result = await session.execute(
-        select(Organization)
-        .options(*_ORG_OPTIONS)
-        .join(
-            buildings_in_radius_select,
-            Organization.building_id == buildings_in_radius_select.c.id,
+    stmt = select(Organization).join(
+        buildings_in_radius_select,
+        Organization.building_id == buildings_in_radius_select.c.id,
+    )
+    async with decision_session(decision, session) as query_session:
+        await set_total_count(query_session, response, count_request, stmt)
+        organizations = await fetch_organizations(
+            query_session, stmt.offset(offset).limit(limit), fieldset
         )
-        .offset(offset)
+    return render_organizations(organizations, fieldset, response)
+
+
+@router.post("/organizations/in_radius/batch", response_model=RadiusBatchReadSchema)
+async def read_organizations_in_radius_batch(
+    query: RadiusBatchQuerySchema,
+    response: Response,
+    session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    limit: int = Query(
+        DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Organizations per center"
+    ),
+):
+    """Organizations around many centers at once. The centers are unnested
+    into a derived table and each one drives an index-assisted LATERAL lookup,
+    so the whole batch is a single statement. Organizations that match several
+    centers are returned once. The cost guard sees the candidates of all
+    centers together; the cap policy shrinks every radius by the same factor."""
+    decision = await guard_query_cost(
+        session,
+        response,
+        lambda scale: union_all(
+            *(
+                select(Organization.id)
+                .join(Building, Organization.building_id == Building.id)
+                .where(
+                    get_bounds_condition(
+                        get_bounding_box(
+                            center.latitude, center.longitude, center.radius_km * scale
+                        )
+                    )
+                )
+                for center in query.centers
+            )
+        ),
+    )
+    center_columns = (
+        "latitude",
+        "longitude",
+        "radius_km",
+        "min_lat",
+        "max_lat",
+        "min_lon",
+        "max_lon",
+    )
+    center_values = zip(
+        *(
+            (
+                center.latitude,
+                center.longitude,
+                center.radius_km * decision.scale,
+                *get_bounding_box(
+                    center.latitude,
+                    center.longitude,
+                    center.radius_km * decision.scale,
+                ),
+            )
+            for center in query.centers
+        )
+    )
+    centers = (
+        func.unnest(*(literal(list(values), ARRAY(Float)) for values in center_values))
+        .table_valued(*center_columns, with_ordinality="position")
+        .render_derived(name="centers")
+    )
+
+    matches = (
+        select(Organization.id)
+        .join(Building, Organization.building_id == Building.id)
+        .where(
+            get_bounds_condition(
+                (
+                    centers.c.min_lat,
+                    centers.c.max_lat,
+                    centers.c.min_lon,
+                    centers.c.max_lon,
+                )
+            ),
+            get_haversine_distance_expression(centers.c.latitude, centers.c.longitude)
+            <= centers.c.radius_km,
+        )
+        .order_by(asc(Organization.id))
         .limit(limit)
+        .lateral("matches")
+    )
+    async with decision_session(decision, session) as query_session:
+        result = await query_session.execute(
+            select(centers.c.position, matches.c.id)
+            .select_from(centers)
+            .join(matches, true())
+            .order_by(centers.c.position, matches.c.id)
+        )
+
+        organization_ids = [[] for _ in query.centers]
+        for position, organization_id in result:
+            organization_ids[position - 1].append(organization_id)
+
+        unique_ids = sorted({id_ for ids in organization_ids for id_ in ids})
+        organizations = []
+        if unique_ids:
+            organizations = await fetch_organizations(
+                query_session,
+                select(Organization)
+                .where(Organization.id == any_(literal(unique_ids, ARRAY(Integer))))
+                .order_by(asc(Organization.id)),
+                fieldset,
+            )
+    batch = {
+        "results": [
+            {"center": index, "organization_ids": ids}
+            for index, ids in enumerate(organization_ids)
+        ],
+        "organizations": organizations,
+    }
+    if fieldset is None:
+        return batch
+    return _render_partial(
+        batch, get_partial_radius_batch_schema(fieldset), response
     )
-    organizations = result.unique().scalars().all()
-    return organizations
 
 
 @router.get("/organizations/in_rectangle/", response_model=List[OrganizationReadSchema])
 async def read_organizations_in_rectangle(
+    response: Response,
     session: AsyncSession = Depends(get_db),
-    latitude: float = Query(..., description="Latitude of the center point"),
-    longitude: float = Query(..., description="Longitude of the center point"),
-    width: float = Query(..., gt=0, description="Rectangle width in degrees"),
-    height: float = Query(..., gt=0, description="Rectangle height in degrees"),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
+    latitude: float = Query(
+        ..., ge=-90, le=90, description="Latitude of the center point"
+    ),
+    longitude: float = Query(
+        ..., ge=-180, le=180, description="Longitude of the center point"
+    ),
+    width: float = Query(
+        ..., gt=0, le=360, description="Rectangle width in degrees"
+    ),
+    height: float = Query(
+        ..., gt=0, le=180, description="Rectangle height in degrees"
+    ),
     offset: int = Query(0, ge=0),
     limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
 ):
-    min_latitude = latitude - (height / 2)
-    max_latitude = latitude + (height / 2)
-    min_longitude = longitude - (width / 2)
-    max_longitude = longitude + (width / 2)
+    decision = None
+    geo_index = get_geo_index()
+    if geo_index is not None:
+        decision = await guard_query_cost(
+            session,
+            response,
+            lambda scale: count_in_thread(
+                geo_index.in_rectangle,
+                get_rectangle_bounds(
+                    latitude, longitude, width * scale, height * scale
+                ),
+            ),
+        )
+        building_ids = await search_in_thread(
+            geo_index.in_rectangle,
+            get_rectangle_bounds(
+                latitude, longitude, width * decision.scale, height * decision.scale
+            ),
+        )
+        if len(building_ids) <= GEO_INDEX_MAX_IDS:
+            stmt = select(Organization).where(
+                ids_condition(Organization.building_id, building_ids)
+            )
+            async with decision_session(decision, session) as query_session:
+                await set_total_count(query_session, response, count_request, stmt)
+                organizations = await fetch_organizations(
+                    query_session, stmt.offset(offset).limit(limit), fieldset
+                )
+            return render_organizations(organizations, fieldset, response)
+
+    if decision is None:
+        decision = await guard_query_cost(
+            session,
+            response,
+            lambda scale: select(Organization.id)
+            .join(Building, Organization.building_id == Building.id)
+            .where(
+                get_bounds_condition(
+                    get_rectangle_bounds(
+                        latitude, longitude, width * scale, height * scale
+                    )
+                )
+            ),
+        )
+    width *= decision.scale
+    height *= decision.scale
 
     buildings_in_rectangle_select = (
         select(Building.id)
         .where(
-            Building.latitude.between(min_latitude, max_latitude),
-            Building.longitude.between(min_longitude, max_longitude),
+            get_bounds_condition(
+                get_rectangle_bounds(latitude, longitude, width, height)
+            )
         )
         .subquery("buildings_in_rectangle")
     )
 
-    result = await session.execute(
-        select(Organization)
-        .options(*_ORG_OPTIONS)
-        .join(
-            buildings_in_rectangle_select,
-            Organization.building_id == buildings_in_rectangle_select.c.id,
+    stmt = select(Organization).join(
+        buildings_in_rectangle_select,
+        Organization.building_id == buildings_in_rectangle_select.c.id,
+    )
+    async with decision_session(decision, session) as query_session:
+        await set_total_count(query_session, response, count_request, stmt)
+        organizations = await fetch_organizations(
+            query_session, stmt.offset(offset).limit(limit), fieldset
         )
-        .offset(offset)
-        .limit(limit)
+    return render_organizations(organizations, fieldset, response)
+
+
+@router.post("/organizations/in_polygon", response_model=List[OrganizationReadSchema])
+async def read_organizations_in_polygon(
+    area: GeoJsonAreaSchema,
+    response: Response,
+    session: AsyncSession = Depends(get_db),
+    fieldset: frozenset[str] | None = Depends(get_fieldset),
+    count_request: CountRequest | None = Depends(get_count_request),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+):
+    """Organizations whose building is inside a GeoJSON Polygon or
+    MultiPolygon (holes excluded)."""
+    stmt = (
+        select(Organization)
+        .join(Building, Organization.building_id == Building.id)
+        .where(get_polygon_condition(area))
+    )
+    await set_total_count(session, response, count_request, stmt)
+    organizations = await fetch_organizations(
+        session, stmt.offset(offset).limit(limit), fieldset
     )
-    organizations = result.unique().scalars().all()
-    return organizations
+    return render_organizations(organizations, fieldset, response)
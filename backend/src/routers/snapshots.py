@@ -0,0 +1,63 @@
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse
+
+from src.routers.api import router
+from src.snapshots import find_snapshot, read_latest, snapshot_path
+
+
+def _latest_or_404() -> dict:
+    snapshot = read_latest()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No snapshot has been built yet")
+    return snapshot
+
+
+def _snapshot_etag(name: str) -> str:
+    # Snapshot files are never rewritten, so the name identifies the content.
+    return f'"{name}"'
+
+
+@router.get("/snapshots/latest", response_class=FileResponse)
+async def read_latest_snapshot(request: Request):
+    """The latest organization directory as gzip-compressed NDJSON. Served from
+    disk (sendfile where the server supports it) with Range / If-Range support.
+    Content-Location names the file, which resumed downloads should fetch from
+    /snapshots/{name} so a newer snapshot cannot be spliced in."""
+    snapshot = _latest_or_404()
+    return FileResponse(
+        snapshot_path(snapshot),
+        media_type="application/gzip",
+        filename=snapshot["file"],
+        headers={
+            "ETag": _snapshot_etag(snapshot["file"]),
+            "Content-Location": str(
+                request.url_for("read_snapshot", name=snapshot["file"])
+            ),
+            "X-Snapshot-Created-At": snapshot["created_at"],
+            "X-Snapshot-Organizations": str(snapshot["organizations"]),
+        },
+    )
+
+
+@router.get("/snapshots/latest/index")
+async def read_latest_snapshot_index():
+    """Metadata of the latest snapshot with the byte offset and length of each
+    chunk and the organization id range it holds. Every chunk is a standalone
+    gzip member, so a single Range request fetches any id range."""
+    return _latest_or_404()
+
+
+@router.get("/snapshots/{name}", response_class=FileResponse)
+async def read_snapshot(name: str):
+    """A snapshot file by name, available while it is among the SNAPSHOT_KEEP
+    most recent ones. Range requests with If-Range only get partial content
+    while the ETag still matches."""
+    path = find_snapshot(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return FileResponse(
+        path,
+        media_type="application/gzip",
+        filename=name,
+        headers={"ETag": _snapshot_etag(name)},
+    )
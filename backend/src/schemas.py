@@ -1,6 +1,9 @@
 from __future__ import annotations
-from pydantic import ConfigDict, BaseModel, Field
-from typing import List
+from functools import lru_cache
+from pydantic import ConfigDict, BaseModel, Field, create_model
+from typing import Annotated, Any, List, Literal, Union
+
+from src.routers.api import MAX_RADIUS_KM
 
 class PhoneReadSchema(BaseModel):
     id: int
@@ -12,9 +15,15 @@ class ActivityBaseReadSchema(BaseModel):
     id: int
     name: str
     parent_id: int | None = None
+    # Only present when requested with with_counts.
+    direct_count: int | None = Field(None, exclude_if=lambda count: count is None)
+    branch_count: int | None = Field(None, exclude_if=lambda count: count is None)
 
     model_config = ConfigDict(from_attributes=True)
 
+class ActivityFacetSchema(ActivityBaseReadSchema):
+    count: int
+
 class ActivityTreeReadSchema(ActivityBaseReadSchema):
     children: List[ActivityTreeReadSchema] = Field(default_factory=list)
 
@@ -34,3 +43,93 @@ class OrganizationReadSchema(BaseModel):
     activities: List[ActivityBaseReadSchema] = Field(default_factory=list)
     
     model_config = ConfigDict(from_attributes=True)
+
+class RadiusCenterSchema(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    radius_km: float = Field(..., gt=0, le=MAX_RADIUS_KM)
+
+class RadiusBatchQuerySchema(BaseModel):
+    centers: List[RadiusCenterSchema] = Field(..., min_length=1, max_length=500)
+
+class RadiusBatchMatchSchema(BaseModel):
+    center: int
+    organization_ids: List[int] = Field(default_factory=list)
+
+class RadiusBatchReadSchema(BaseModel):
+    results: List[RadiusBatchMatchSchema] = Field(default_factory=list)
+    organizations: List[OrganizationReadSchema] = Field(default_factory=list)
+
+# GeoJSON geometry, positions are [longitude, latitude] (an altitude is ignored).
+GeoJsonPosition = Annotated[List[float], Field(min_length=2, max_length=3)]
+GeoJsonLinearRing = Annotated[List[GeoJsonPosition], Field(min_length=4)]
+GeoJsonPolygonCoordinates = Annotated[List[GeoJsonLinearRing], Field(min_length=1)]
+
+class GeoJsonPolygonSchema(BaseModel):
+    type: Literal["Polygon"]
+    # The exterior ring followed by the holes.
+    coordinates: GeoJsonPolygonCoordinates
+
+class GeoJsonMultiPolygonSchema(BaseModel):
+    type: Literal["MultiPolygon"]
+    coordinates: List[GeoJsonPolygonCoordinates] = Field(..., min_length=1)
+
+GeoJsonAreaSchema = Annotated[
+    Union[GeoJsonPolygonSchema, GeoJsonMultiPolygonSchema],
+    Field(discriminator="type"),
+]
+
+@lru_cache
+def get_partial_organization_schema(fields: frozenset[str]) -> type[BaseModel]:
+    """OrganizationReadSchema restricted to ``fields`` (sparse fieldsets)."""
+    return create_model(
+        "OrganizationPartialReadSchema",
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (field.annotation, field)
+            for name, field in OrganizationReadSchema.model_fields.items()
+            if name in fields
+        },
+    )
+
+@lru_cache
+def get_partial_radius_batch_schema(fields: frozenset[str]) -> type[BaseModel]:
+    return create_model(
+        "RadiusBatchPartialReadSchema",
+        __base__=RadiusBatchReadSchema,
+        organizations=(
+            List[get_partial_organization_schema(fields)],
+            Field(default_factory=list),
+        ),
+    )
+
+class ChangeReadSchema(BaseModel):
+    entity: str
+    id: int
+    version: int
+    deleted: bool = False
+    data: dict | None = None
+
+class ChangesPageSchema(BaseModel):
+    changes: List[ChangeReadSchema] = Field(default_factory=list)
+    next_token: str
+    has_more: bool
+
+class BatchSubRequestSchema(BaseModel):
+    id: str | None = None
+    method: Literal["GET", "POST"] = "GET"
+    # Path and query string relative to /api, e.g. "/organizations/1?fields=name".
+    url: str = Field(..., pattern=r"^/")
+    body: Any = None
+
+class BatchQuerySchema(BaseModel):
+    requests: List[BatchSubRequestSchema] = Field(..., min_length=1, max_length=50)
+
+class BatchSubResponseSchema(BaseModel):
+    id: str | None = None
+    status: int
+    headers: dict[str, str] = Field(default_factory=dict)
+    body: Any = None
+
+class BatchReadSchema(BaseModel):
+    responses: List[BatchSubResponseSchema] = Field(default_factory=list)
@@ -0,0 +1,145 @@
+REFRESH_ACTIVITY_ORGANIZATION_COUNTS = """
+    CREATE OR REPLACE FUNCTION refresh_activity_organization_counts(changed_ids INT[]) RETURNS void AS $$
+    DECLARE
+        affected_ids INT[];
+    BEGIN
+        -- A change to an activity's organizations or position in the tree
+        -- affects its own counts and the branch counts of all its ancestors.
+        WITH RECURSIVE affected(id) AS (
+            SELECT id FROM activities WHERE id = ANY(changed_ids)
+            UNION
+            SELECT a.parent_id FROM activities a JOIN affected ON a.id = affected.id
+            WHERE a.parent_id IS NOT NULL
+        )
+        SELECT array_agg(id ORDER BY id) INTO affected_ids FROM affected;
+        IF affected_ids IS NULL THEN
+            RETURN;
+        END IF;
+
+        -- Counts are recomputed rather than adjusted by deltas, since an
+        -- organization is counted once per branch however many of its
+        -- activities fall in it. Locking first serializes concurrent
+        -- refreshes, and the recount below then sees their committed links.
+        PERFORM 1 FROM activity_organization_counts
+        WHERE activity_id = ANY(affected_ids)
+        ORDER BY activity_id
+        FOR UPDATE;
+
+        WITH RECURSIVE branch(root_id, id) AS (
+            SELECT root_id, root_id FROM unnest(affected_ids) AS root_id
+            UNION ALL
+            SELECT branch.root_id, a.id FROM activities a JOIN branch ON a.parent_id = branch.id
+        )
+        INSERT INTO activity_organization_counts (activity_id, direct_count, branch_count)
+        SELECT
+            root.id,
+            (SELECT count(*) FROM organization_activities oa WHERE oa.activity_id = root.id),
+            (SELECT count(DISTINCT oa.organization_id)
+             FROM branch JOIN organization_activities oa ON oa.activity_id = branch.id
+             WHERE branch.root_id = root.id)
+        FROM unnest(affected_ids) AS root(id)
+        ON CONFLICT (activity_id) DO UPDATE SET
+            direct_count = EXCLUDED.direct_count,
+            branch_count = EXCLUDED.branch_count;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+SYNC_FUNCTIONS = (
+    """
+    CREATE OR REPLACE FUNCTION activity_counts_sync_links() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM refresh_activity_organization_counts(ARRAY(SELECT activity_id FROM new_rows));
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM refresh_activity_organization_counts(ARRAY(SELECT activity_id FROM old_rows));
+        ELSE
+            PERFORM refresh_activity_organization_counts(ARRAY(
+                SELECT activity_id FROM new_rows
+                UNION
+                SELECT activity_id FROM old_rows
+            ));
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+""",
+    """
+    CREATE OR REPLACE FUNCTION activity_counts_sync_activities() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM refresh_activity_organization_counts(ARRAY(SELECT id FROM new_rows));
+        ELSIF TG_OP = 'DELETE' THEN
+            -- The deleted activities' counters go with them (ON DELETE CASCADE),
+            -- their former ancestors lose the branch.
+            PERFORM refresh_activity_organization_counts(ARRAY(
+                SELECT parent_id FROM old_rows WHERE parent_id IS NOT NULL
+            ));
+        ELSE
+            -- Moved activities: the new ancestors are reached from the
+            -- activity itself, the old ones from its previous parent.
+            PERFORM refresh_activity_organization_counts(ARRAY(
+                SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.parent_id IS DISTINCT FROM o.parent_id
+                UNION
+                SELECT o.parent_id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.parent_id IS DISTINCT FROM o.parent_id AND o.parent_id IS NOT NULL
+            ));
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+""",
+)
+
+SETUP_TRIGGERS = (
+    """
+    CREATE TRIGGER activity_counts_links_insert
+    AFTER INSERT ON organization_activities REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION activity_counts_sync_links();
+""",
+    """
+    CREATE TRIGGER activity_counts_links_update
+    AFTER UPDATE ON organization_activities REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION activity_counts_sync_links();
+""",
+    """
+    CREATE TRIGGER activity_counts_links_delete
+    AFTER DELETE ON organization_activities REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION activity_counts_sync_links();
+""",
+    """
+    CREATE TRIGGER activity_counts_activities_insert
+    AFTER INSERT ON activities REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION activity_counts_sync_activities();
+""",
+    """
+    CREATE TRIGGER activity_counts_activities_update
+    AFTER UPDATE ON activities REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION activity_counts_sync_activities();
+""",
+    """
+    CREATE TRIGGER activity_counts_activities_delete
+    AFTER DELETE ON activities REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION activity_counts_sync_activities();
+""",
+)
+
+BACKFILL = """
+    SELECT refresh_activity_organization_counts(ARRAY(SELECT id FROM activities));
+"""
+
+DROP_TRIGGERS = (
+    "DROP TRIGGER IF EXISTS activity_counts_links_insert ON organization_activities;",
+    "DROP TRIGGER IF EXISTS activity_counts_links_update ON organization_activities;",
+    "DROP TRIGGER IF EXISTS activity_counts_links_delete ON organization_activities;",
+    "DROP TRIGGER IF EXISTS activity_counts_activities_insert ON activities;",
+    "DROP TRIGGER IF EXISTS activity_counts_activities_update ON activities;",
+    "DROP TRIGGER IF EXISTS activity_counts_activities_delete ON activities;",
+)
+
+DROP_FUNCTIONS = (
+    "DROP FUNCTION IF EXISTS activity_counts_sync_links();",
+    "DROP FUNCTION IF EXISTS activity_counts_sync_activities();",
+    "DROP FUNCTION IF EXISTS refresh_activity_organization_counts(INT[]);",
+)
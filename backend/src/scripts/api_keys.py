@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import secrets
+
+from sqlalchemy import update
+
+from src.database import AsyncSessionLocal
+from src.models import ApiKey
+from src.security import hash_api_key
+
+
+async def create_key(tenant: str, scopes: list[str]):
+    api_key = secrets.token_urlsafe(32)
+    async with AsyncSessionLocal() as session:
+        session.add(ApiKey(key_hash=hash_api_key(api_key), tenant=tenant, scopes=scopes))
+        await session.commit()
+    print(api_key)
+
+
+async def revoke_key(api_key: str):
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(ApiKey)
+            .where(ApiKey.key_hash == hash_api_key(api_key))
+            .values(revoked=True)
+        )
+        await session.commit()
+    print(f"Revoked {result.rowcount} key(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage API keys stored in the api_keys table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create")
+    create.add_argument("--tenant", required=True)
+    create.add_argument("--scope", dest="scopes", action="append", default=[])
+
+    revoke = commands.add_parser("revoke")
+    revoke.add_argument("api_key")
+
+    args = parser.parse_args()
+    if args.command == "create":
+        asyncio.run(create_key(args.tenant, args.scopes))
+    else:
+        asyncio.run(revoke_key(args.api_key))
@@ -0,0 +1,106 @@
+import argparse
+import gzip
+import json
+import statistics
+import time
+import urllib.request
+
+import brotli
+import msgpack
+
+from src.encoding import BROTLI_QUALITY, GZIP_LEVEL
+
+ENCODINGS = {
+    "json": {"Accept": "application/json"},
+    "json+gzip": {"Accept": "application/json", "Accept-Encoding": "gzip"},
+    "json+br": {"Accept": "application/json", "Accept-Encoding": "br"},
+    "msgpack": {"Accept": "application/msgpack"},
+    "msgpack+gzip": {"Accept": "application/msgpack", "Accept-Encoding": "gzip"},
+    "msgpack+br": {"Accept": "application/msgpack", "Accept-Encoding": "br"},
+}
+
+
+def build_page(n: int) -> list[dict]:
+    """A page shaped like OrganizationReadSchema, with the repetitive nested
+    building/activity objects real pages have."""
+    return [
+        {
+            "id": i,
+            "name": f"Organization {i}",
+            "building": {
+                "id": i % 15 + 1,
+                "address": f"Testcity, test St. {i % 15}",
+                "latitude": 55.75 + (i % 15) / 100,
+                "longitude": 37.61 + (i % 15) / 100,
+            },
+            "phones": [
+                {"id": 2 * i, "number": f"+79000{2 * i:06d}"},
+                {"id": 2 * i + 1, "number": f"+79000{2 * i + 1:06d}"},
+            ],
+            "activities": [
+                {"id": a, "name": f"Activity {a - 1}", "parent_id": (a - 1) // 3 or None}
+                for a in (i % 30 + 1, i % 7 + 10, i % 5 + 20)
+            ],
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def encode(page: list[dict], encoding: str) -> bytes:
+    fmt, _, coding = encoding.partition("+")
+    body = json.dumps(page, separators=(",", ":")).encode() if fmt == "json" else msgpack.packb(page)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+
+def bench_offline(page_size: int, repeat: int):
+    page = build_page(page_size)
+    print(f"Synthetic page of {page_size} organizations")
+    print(f"{'encoding':<14}{'bytes':>10}{'encode ms':>12}")
+    for encoding in ENCODINGS:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = encode(page, encoding)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{encoding:<14}{len(body):>10}{statistics.median(timings):>12.3f}")
+
+
+def bench_http(url: str, api_key: str, repeat: int):
+    print(f"GET {url}")
+    print(f"{'encoding':<14}{'bytes on wire':>14}{'p50 ms':>10}{'p95 ms':>10}")
+    for encoding, headers in ENCODINGS.items():
+        timings = []
+        size = 0
+        for _ in range(repeat):
+            request = urllib.request.Request(url, headers={"X-API-Key": api_key, **headers})
+            started = time.perf_counter()
+            with urllib.request.urlopen(request) as response:
+                size = len(response.read())
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{encoding:<14}{size:>14}{statistics.median(timings):>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare bytes on wire and latency of the negotiated response encodings"
+    )
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--url",
+        help="Endpoint of a running app to measure end to end, "
+        "e.g. http://127.0.0.1:8000/api/organizations?limit=100",
+    )
+    parser.add_argument("--api-key", default="dev-api-key")
+    args = parser.parse_args()
+
+    bench_offline(args.page_size, args.repeat)
+    if args.url:
+        print()
+        bench_http(args.url, args.api_key, args.repeat)
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# The app runs in process; keep the benchmark's own requests under the rate limit.
+os.environ.setdefault("RATE_LIMIT_BURST", "1000000")
+
+import httpx
+from sqlalchemy import event
+
+from src.database import engine
+from src.main import app
+
+# (label, query string appended to every endpoint)
+FIELDSETS = (
+    ("full", ""),
+    ("autocomplete", "fields=name"),
+    ("map pins", "fields=id&include=building"),
+    ("with phones", "include=phones"),
+    ("everything", "include=building,phones,activities"),
+)
+
+ENDPOINTS = (
+    "/api/organizations?limit={limit}",
+    "/api/organizations/by_activity_branch/1?limit={limit}",
+)
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+async def main(api_key: str, limit: int, repeat: int):
+    counter = StatementCounter()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        headers={"X-API-Key": api_key},
+    ) as client:
+        for endpoint in ENDPOINTS:
+            path = endpoint.format(limit=limit)
+            print(f"GET {path}")
+            print(f"{'fieldset':<14}{'queries':>8}{'bytes':>9}{'p50 ms':>9}")
+            for label, query in FIELDSETS:
+                url = f"{path}&{query}" if query else path
+                timings = []
+                for _ in range(repeat):
+                    counter.count = 0
+                    started = time.perf_counter()
+                    response = await client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    response.raise_for_status()
+                print(
+                    f"{label:<14}{counter.count:>8}{len(response.content):>9}"
+                    f"{statistics.median(timings):>9.2f}"
+                )
+            print()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Queries, payload size and latency of organization endpoints "
+        "per sparse fieldset"
+    )
+    parser.add_argument("--api-key", default="dev-api-key")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.api_key, args.limit, args.repeat))
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import select, text
+
+from src.database import engine
+from src.geo_index import BuildingGeoIndex
+from src.models import Building
+from src.routers.api import (
+    get_bounding_box,
+    get_bounds_condition,
+    get_haversine_distance_expression,
+)
+
+RADII_KM = (1, 10, 50)
+
+
+def synthetic_buildings(count: int, seed: int = 0):
+    """Buildings clustered around a few hundred city centers, roughly the shape
+    of real address data."""
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack(
+        (rng.uniform(-60, 70, 300), rng.uniform(-180, 180, 300))
+    )
+    city = rng.integers(0, len(centers), count)
+    latitudes = np.clip(centers[city, 0] + rng.normal(0, 0.3, count), -90, 90)
+    longitudes = np.clip(centers[city, 1] + rng.normal(0, 0.3, count), -180, 180)
+    return np.arange(1, count + 1), latitudes, longitudes
+
+
+def percentiles(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return f"{statistics.median(timings):>9.3f}{p95:>9.3f}"
+
+
+def query_points(latitudes, longitudes, repeat: int):
+    """Query centers drawn from the data itself, so queries hit populated cells."""
+    rows = random.Random(1).sample(range(len(latitudes)), repeat)
+    return [(float(latitudes[row]), float(longitudes[row])) for row in rows]
+
+
+def bench_index(count: int, repeat: int):
+    ids, latitudes, longitudes = synthetic_buildings(count)
+    started = time.perf_counter()
+    index = BuildingGeoIndex(ids, latitudes, longitudes)
+    build_seconds = time.perf_counter() - started
+    print(
+        f"{count} buildings: built in {build_seconds:.2f}s, "
+        f"{index.nbytes / 2**20:.1f} MiB ({index.nbytes / count:.1f} bytes/building)"
+    )
+    print(f"{'radius km':>10}{'matches':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    points = query_points(latitudes, longitudes, repeat)
+    for radius_km in RADII_KM:
+        timings, matches = [], []
+        for latitude, longitude in points:
+            started = time.perf_counter()
+            found = index.in_radius(latitude, longitude, radius_km)
+            timings.append((time.perf_counter() - started) * 1000)
+            matches.append(len(found))
+        print(f"{radius_km:>10}{int(statistics.median(matches)):>10}{percentiles(timings)}")
+    return ids, latitudes, longitudes
+
+
+async def bench_sql(ids, latitudes, longitudes, repeat: int):
+    """The same queries through Postgres, against a temporary ``buildings``
+    table that shadows the real one for this connection only."""
+    print("Postgres, bounding box + haversine over the lat/lon index")
+    print(f"{'radius km':>10}{'matches':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    async with engine.connect() as conn:
+        await conn.execute(
+            text(
+                "CREATE TEMP TABLE buildings "
+                "(id INT PRIMARY KEY, address TEXT, latitude FLOAT, longitude FLOAT)"
+            )
+        )
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "buildings",
+            records=zip(ids.tolist(), latitudes.tolist(), longitudes.tolist()),
+            columns=["id", "latitude", "longitude"],
+            schema_name="pg_temp",
+        )
+        await conn.execute(
+            text("CREATE INDEX ON buildings (latitude, longitude)")
+        )
+        await conn.execute(text("ANALYZE buildings"))
+
+        points = query_points(latitudes, longitudes, repeat)
+        for radius_km in RADII_KM:
+            timings, matches = [], []
+            for latitude, longitude in points:
+                stmt = select(Building.id).where(
+                    get_bounds_condition(get_bounding_box(latitude, longitude, radius_km)),
+                    get_haversine_distance_expression(latitude, longitude) <= radius_km,
+                )
+                started = time.perf_counter()
+                found = (await conn.execute(stmt)).all()
+                timings.append((time.perf_counter() - started) * 1000)
+                matches.append(len(found))
+            print(f"{radius_km:>10}{int(statistics.median(matches)):>10}{percentiles(timings)}")
+        await conn.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Memory, build time and query latency of the in-memory geo index"
+    )
+    parser.add_argument(
+        "--counts", type=int, nargs="+", default=[1_000_000, 10_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument(
+        "--sql",
+        action="store_true",
+        help="Also load the smallest dataset into Postgres and time the SQL path",
+    )
+    args = parser.parse_args()
+
+    datasets = {}
+    for count in args.counts:
+        datasets[count] = bench_index(count, args.repeat)
+        print()
+    if args.sql:
+        asyncio.run(bench_sql(*datasets[min(datasets)], args.repeat))
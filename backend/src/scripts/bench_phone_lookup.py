@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.database import engine
+from src.routers.organizations import get_phone_lookup_page
+
+# TEMP tables shadow the real ones, so the endpoint's statement runs against
+# them unchanged. Only the columns it reads.
+CREATE_ORGANIZATIONS = """
+    CREATE TEMP TABLE organizations (
+        id INT PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        building_id INT,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+FILL_ORGANIZATIONS = """
+    INSERT INTO organizations (id, name, building_id)
+    SELECT i, 'Organization ' || i, i FROM generate_series(1, :count / 2 + 1) AS i
+"""
+
+# Same definition as organization_phones.number_normalized.
+CREATE_PHONES = """
+    CREATE TEMP TABLE organization_phones (
+        id INT PRIMARY KEY,
+        number VARCHAR(50) NOT NULL,
+        organization_id INT NOT NULL,
+        number_normalized VARCHAR(50) COLLATE "C"
+            GENERATED ALWAYS AS (regexp_replace(number, '\\D', '', 'g')) STORED
+    )
+"""
+
+# Formatted numbers, so the generated column has actual work to do.
+FILL_PHONES = """
+    INSERT INTO organization_phones (id, number, organization_id)
+    SELECT i,
+           format('+7 (9%s) %s-%s-%s', lpad((i / 10000000)::text, 2, '0'),
+                  lpad((i / 10000 % 1000)::text, 3, '0'),
+                  lpad((i / 100 % 100)::text, 2, '0'),
+                  lpad((i % 100)::text, 2, '0')),
+           i / 2 + 1
+    FROM generate_series(0, :count - 1) AS i
+"""
+
+
+def digits_of(i: int) -> str:
+    return f"79{i // 10_000_000:02d}{i // 10_000 % 1000:03d}{i // 100 % 100:02d}{i % 100:02d}"
+
+
+async def time_lookups(conn, label: str, prefixes: list[str], prefix: bool, limit: int):
+    timings, matches = [], []
+    for digits in prefixes:
+        stmt = get_phone_lookup_page(digits, prefix, 0, limit)
+        started = time.perf_counter()
+        rows = (await conn.execute(stmt)).all()
+        timings.append((time.perf_counter() - started) * 1000)
+        matches.append(len(rows))
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"{label:<22}{int(statistics.median(matches)):>8}"
+        f"{statistics.median(timings):>9.3f}{p95:>9.3f}"
+    )
+
+
+async def main(count: int, repeat: int, limit: int):
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        await conn.execute(text(CREATE_ORGANIZATIONS))
+        await conn.execute(text(FILL_ORGANIZATIONS), {"count": count})
+        await conn.execute(text(CREATE_PHONES))
+        await conn.execute(text(FILL_PHONES), {"count": count})
+        await conn.execute(
+            text("CREATE INDEX ON organization_phones (number_normalized)")
+        )
+        await conn.execute(text("CREATE INDEX ON organization_phones (organization_id)"))
+        await conn.execute(text("ANALYZE organizations, organization_phones"))
+        print(f"Loaded {count} phones in {time.perf_counter() - started:.1f}s")
+
+        prefix_lookup = get_phone_lookup_page(
+            digits_of(count // 2)[:8], True, 0, limit
+        ).compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+        plan = await conn.execute(text(f"EXPLAIN {prefix_lookup}"))
+        print("Prefix plan:", " / ".join(row[0].strip() for row in plan))
+
+        rng = random.Random(0)
+        numbers = [digits_of(rng.randrange(count)) for _ in range(repeat)]
+        print(f"{'lookup':<22}{'matches':>8}{'p50 ms':>9}{'p95 ms':>9}")
+        await time_lookups(conn, "exact", numbers, False, limit)
+        for length in (10, 8, 6):
+            await time_lookups(
+                conn, f"prefix {length} digits", [n[:length] for n in numbers], True, limit
+            )
+        await conn.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency of the by_phone endpoint query for exact and prefix lookups"
+    )
+    parser.add_argument("--count", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.repeat, args.limit))
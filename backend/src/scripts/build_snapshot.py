@@ -0,0 +1,20 @@
+import asyncio
+
+from src.database import engine
+from src.snapshots import build_snapshot
+
+
+async def main():
+    snapshot = await build_snapshot()
+    await engine.dispose()
+    if snapshot is None:
+        print("Another process is building a snapshot")
+        return
+    print(
+        f"Built {snapshot['file']}: {snapshot['organizations']} organizations, "
+        f"{snapshot['size']} bytes in {len(snapshot['chunks'])} chunks"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+# The writing transaction's id as bigint (xid8 never wraps around). The feed
+# only emits changes of transactions older than every one still running.
+CURRENT_XACT_ID = "pg_current_xact_id()::text::bigint"
+
+TRACK_ROW_VERSION = f"""
+    CREATE OR REPLACE FUNCTION track_row_version() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := nextval('change_version_seq');
+        NEW.xact_id := {CURRENT_XACT_ID};
+        NEW.updated_at := clock_timestamp();
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+RECORD_TOMBSTONE = """
+    CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO change_tombstones (entity, entity_id) VALUES (TG_TABLE_NAME, OLD.id);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+# Links between organizations and activities have no row of their own in the
+# feed; changing them bumps the version of the organization instead.
+TOUCH_ORGANIZATION_VERSION = """
+    CREATE OR REPLACE FUNCTION touch_organization_version() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE organizations SET version = version
+            WHERE id IN (SELECT organization_id FROM new_rows);
+        ELSE
+            UPDATE organizations SET version = version
+            WHERE id IN (SELECT organization_id FROM old_rows);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+TRACKED_TABLES = ("buildings", "organizations", "organization_phones", "activities")
+
+SETUP_TRIGGERS = tuple(
+    f"""
+    CREATE TRIGGER {table}_track_version
+    BEFORE INSERT OR UPDATE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION track_row_version();
+    """
+    for table in TRACKED_TABLES
+) + tuple(
+    f"""
+    CREATE TRIGGER {table}_tombstone
+    AFTER DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION record_tombstone();
+    """
+    for table in TRACKED_TABLES
+) + (
+    """
+    CREATE TRIGGER organization_activities_touch_organization_insert
+    AFTER INSERT ON organization_activities REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_organization_version();
+    """,
+    """
+    CREATE TRIGGER organization_activities_touch_organization_delete
+    AFTER DELETE ON organization_activities REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_organization_version();
+    """,
+)
+
+DROP_TRIGGERS = tuple(
+    f"DROP TRIGGER IF EXISTS {table}_track_version ON {table};" for table in TRACKED_TABLES
+) + tuple(
+    f"DROP TRIGGER IF EXISTS {table}_tombstone ON {table};" for table in TRACKED_TABLES
+) + (
+    "DROP TRIGGER IF EXISTS organization_activities_touch_organization_insert ON organization_activities;",
+    "DROP TRIGGER IF EXISTS organization_activities_touch_organization_delete ON organization_activities;",
+)
+
+DROP_FUNCTIONS = (
+    "DROP FUNCTION IF EXISTS track_row_version();",
+    "DROP FUNCTION IF EXISTS record_tombstone();",
+    "DROP FUNCTION IF EXISTS touch_organization_version();",
+)
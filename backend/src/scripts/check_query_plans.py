@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event, func, select, text
+
+from src.database import engine, AsyncSessionLocal
+from src.models import Activity, Building, Organization, OrganizationPhones
+from src.routers.api import router
+from src.routers import organizations, buildings, activities, changes, snapshots, batch
+from src.schemas import (
+    GeoJsonMultiPolygonSchema,
+    GeoJsonPolygonSchema,
+    RadiusBatchQuerySchema,
+)
+from src.warmup import endpoint_kwargs
+
+# Set-based seed, deterministic so baselines are comparable between runs:
+# 5 root activities with 4 children and 2 grandchildren each, one building per
+# organization spread over the globe, two activities and one phone each.
+SEED_STATEMENTS = (
+    """
+    INSERT INTO activities (name)
+    SELECT 'Plan activity ' || i FROM generate_series(1, 5) AS i
+    """,
+    """
+    INSERT INTO activities (name, parent_id)
+    SELECT p.name || '.' || j, p.id
+    FROM activities p, generate_series(1, 4) AS j
+    WHERE p.name LIKE 'Plan activity %' AND p.parent_id IS NULL
+    """,
+    """
+    INSERT INTO activities (name, parent_id)
+    SELECT p.name || '.' || j, p.id
+    FROM activities p JOIN activities root ON root.id = p.parent_id, generate_series(1, 2) AS j
+    WHERE p.name LIKE 'Plan activity %' AND root.parent_id IS NULL
+    """,
+    """
+    INSERT INTO buildings (address, latitude, longitude)
+    SELECT 'Plan street ' || i,
+           (i::bigint * 7919 % 170000) / 1000.0 - 85,
+           (i::bigint * 104729 % 360000) / 1000.0 - 180
+    FROM generate_series(1, :count) AS i
+    """,
+    """
+    INSERT INTO organizations (name, building_id)
+    SELECT 'Plan organization ' || b.id, b.id
+    FROM buildings b WHERE b.address LIKE 'Plan street %'
+    """,
+    """
+    INSERT INTO organization_activities (organization_id, activity_id)
+    SELECT o.id, a.ids[1 + (o.id * 31 + k * 17) % array_length(a.ids, 1)]
+    FROM organizations o,
+         (SELECT array_agg(id ORDER BY id) AS ids FROM activities
+          WHERE name LIKE 'Plan activity %') AS a,
+         generate_series(0, 1) AS k
+    WHERE o.name LIKE 'Plan organization %'
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO organization_phones (number, organization_id)
+    SELECT '+7 (8' || lpad((o.id % 100)::text, 2, '0') || ') ' || lpad(o.id::text, 7, '0'), o.id
+    FROM organizations o WHERE o.name LIKE 'Plan organization %'
+    """,
+)
+
+# Endpoints that do not touch the database (the batch endpoint only runs other
+# endpoints, which are checked on their own).
+NO_SQL_ENDPOINTS = {
+    batch.read_batch,
+    snapshots.read_latest_snapshot,
+    snapshots.read_latest_snapshot_index,
+    snapshots.read_snapshot,
+}
+
+
+async def seed(count: int):
+    async with engine.begin() as conn:
+        for statement in SEED_STATEMENTS:
+            await conn.execute(text(statement), {"count": count})
+        await conn.execute(text("ANALYZE"))
+    print(f"Seeded {count} buildings and organizations")
+
+
+async def sample_arguments(session) -> dict:
+    """Arguments taken from the data, from the middle of the id range, so
+    lookups hit existing rows."""
+    total = await session.scalar(select(func.count()).select_from(Organization))
+    organization = (
+        await session.execute(
+            select(
+                Organization.id,
+                Organization.name,
+                Organization.building_id,
+                Building.latitude,
+                Building.longitude,
+            )
+            .join(Building, Organization.building_id == Building.id)
+            .order_by(Organization.id)
+            .offset(total // 2)
+            .limit(1)
+        )
+    ).one()
+    activity = (
+        await session.execute(
+            select(Activity.id, Activity.name)
+            .where(Activity.parent_id.is_(None))
+            .order_by(Activity.id.desc())
+            .limit(1)
+        )
+    ).one()
+    phone = await session.scalar(
+        select(OrganizationPhones.number)
+        .where(OrganizationPhones.organization_id == organization.id)
+        .limit(1)
+    )
+    return {
+        "organization": organization,
+        "activity": activity,
+        "phone": phone,
+    }
+
+
+def _square(latitude: float, longitude: float, half_side: float) -> list:
+    return [
+        [longitude - half_side, latitude - half_side],
+        [longitude + half_side, latitude - half_side],
+        [longitude + half_side, latitude + half_side],
+        [longitude - half_side, latitude + half_side],
+        [longitude - half_side, latitude - half_side],
+    ]
+
+
+def plan_calls(sample: dict) -> list:
+    organization = sample["organization"]
+    activity = sample["activity"]
+    area = {"latitude": organization.latitude, "longitude": organization.longitude}
+    # A square with a hole around the sample building, and a second square.
+    polygon = GeoJsonPolygonSchema(
+        type="Polygon",
+        coordinates=[
+            _square(organization.latitude, organization.longitude, 1.0),
+            _square(organization.latitude, organization.longitude, 0.1),
+        ],
+    )
+    multi_polygon = GeoJsonMultiPolygonSchema(
+        type="MultiPolygon",
+        coordinates=[
+            polygon.coordinates,
+            [_square(-organization.latitude, -organization.longitude, 1.0)],
+        ],
+    )
+    return [
+        (activities.read_activities, {}),
+        (activities.read_activity, {"activity_id": activity.id, "with_counts": True}),
+        (changes.read_changes, {"since": None}),
+        (buildings.read_buildings, {}),
+        (buildings.read_building, {"building_id": organization.building_id}),
+        (buildings.read_buildings_in_radius, {**area, "radius_km": 50.0}),
+        (buildings.read_buildings_in_rectangle, {**area, "width": 1.0, "height": 1.0}),
+        (buildings.read_buildings_in_polygon, {"area": polygon}),
+        (organizations.read_organizations, {}),
+        (organizations.read_organization_facets, {**area, "radius_km": 200.0}),
+        (organizations.read_organization, {"organization_id": organization.id}),
+        (
+            organizations.read_organizations_by_building,
+            {"building_id": organization.building_id},
+        ),
+        (organizations.read_organization_by_activity, {"activity_id": activity.id}),
+        (organizations.read_organization_by_activity_name, {"name": activity.name}),
+        (
+            organizations.read_organization_by_activity_branch,
+            {"activity_id": activity.id},
+        ),
+        (
+            organizations.read_organization_by_activity_branch_name,
+            {"name": activity.name},
+        ),
+        (organizations.read_organization_by_name, {"name": organization.name}),
+        (organizations.read_organizations_by_phone, {"number": sample["phone"]}),
+        (
+            organizations.read_organizations_by_phone,
+            {"number": sample["phone"][:8], "prefix": True},
+        ),
+        (organizations.read_organizations_in_radius, {**area, "radius_km": 50.0}),
+        (
+            organizations.read_organizations_in_radius_batch,
+            {
+                "query": RadiusBatchQuerySchema(
+                    centers=[{**area, "radius_km": 50.0}, {**area, "radius_km": 5.0}]
+                )
+            },
+        ),
+        (
+            organizations.read_organizations_in_rectangle,
+            {**area, "width": 1.0, "height": 1.0},
+        ),
+        (organizations.read_organizations_in_polygon, {"area": polygon}),
+        (organizations.read_organizations_in_polygon, {"area": multi_polygon}),
+    ]
+
+
+async def capture_statements(calls: list) -> dict[str, list]:
+    """SQL (with its parameters) issued by each endpoint call, keyed by
+    ``<endpoint>[#n]``. Cost-guard EXPLAINs are left out."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+
+    statements = {}
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with AsyncSessionLocal() as session:
+            seen = {}
+            for endpoint, kwargs in calls:
+                captured.clear()
+                kwargs = await endpoint_kwargs(endpoint, session, **kwargs)
+                await endpoint(**kwargs)
+                name = endpoint.__name__
+                seen[name] = seen.get(name, 0) + 1
+                key = name if seen[name] == 1 else f"{name}#{seen[name]}"
+                statements[key] = list(captured)
+                session.expunge_all()
+            await session.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    return statements
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+async def explain(conn, statement: str, parameters) -> tuple[dict, str]:
+    raw = (await conn.get_raw_connection()).driver_connection
+    parameters = tuple(parameters or ())
+    analyzed = await raw.fetchval(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", *parameters
+    )
+    if isinstance(analyzed, str):
+        analyzed = json.loads(analyzed)
+    rows = await raw.fetch(f"EXPLAIN (COSTS OFF) {statement}", *parameters)
+    return analyzed[0]["Plan"], "\n".join(row[0] for row in rows)
+
+
+async def table_sizes(conn) -> dict[str, float]:
+    result = await conn.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p')")
+    )
+    return dict(result.all())
+
+
+async def check(args) -> bool:
+    async with AsyncSessionLocal() as session:
+        sample = await sample_arguments(session)
+    calls = plan_calls(sample)
+
+    covered = {endpoint for endpoint, _ in calls} | NO_SQL_ENDPOINTS
+    missing = [
+        route.path
+        for route in router.routes
+        if isinstance(route, APIRoute) and route.endpoint not in covered
+    ]
+    statements = await capture_statements(calls)
+
+    baseline_path = os.path.join(args.output, "baselines.json")
+    baselines = {}
+    if os.path.exists(baseline_path) and not args.update_baseline:
+        with open(baseline_path) as file:
+            baselines = json.load(file)
+    os.makedirs(args.output, exist_ok=True)
+
+    failures = []
+    measured = {}
+    print(f"{'statement':<58}{'buffers':>9}{'baseline':>10}  seq scans")
+    async with engine.connect() as conn:
+        sizes = await table_sizes(conn)
+        for key, endpoint_statements in statements.items():
+            snapshot = []
+            for index, (statement, parameters) in enumerate(endpoint_statements):
+                statement_key = f"{key}:{index}"
+                plan, text_plan = await explain(conn, statement, parameters)
+                buffers = plan.get("Shared Hit Blocks", 0) + plan.get(
+                    "Shared Read Blocks", 0
+                )
+                measured[statement_key] = buffers
+                seq_scans = sorted(
+                    {
+                        node["Relation Name"]
+                        for node in _walk(plan)
+                        if node["Node Type"] == "Seq Scan"
+                        and sizes.get(node["Relation Name"], 0) >= args.min_rows
+                    }
+                )
+                baseline = baselines.get(statement_key)
+                if seq_scans:
+                    failures.append(f"{statement_key}: sequential scan on {', '.join(seq_scans)}")
+                if baseline is not None and buffers > baseline * (1 + args.tolerance):
+                    failures.append(
+                        f"{statement_key}: {buffers} buffers, baseline {baseline}"
+                    )
+                print(
+                    f"{statement_key:<58}{buffers:>9}"
+                    f"{'-' if baseline is None else baseline:>10}  {', '.join(seq_scans)}"
+                )
+                snapshot.append(f"-- {statement_key}\n{statement}\n\n{text_plan}\n")
+            with open(os.path.join(args.output, f"{key}.txt"), "w") as file:
+                file.write("\n".join(snapshot))
+        await conn.rollback()
+    await engine.dispose()
+
+    if args.update_baseline:
+        with open(baseline_path, "w") as file:
+            json.dump(measured, file, indent=2, sort_keys=True)
+        print(f"Wrote {len(measured)} baselines to {baseline_path}")
+
+    for path in missing:
+        failures.append(f"{path}: endpoint has no entry in plan_calls")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return not failures
+
+
+async def main(args) -> bool:
+    if args.seed:
+        await seed(args.seed)
+    return await check(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Capture EXPLAIN (ANALYZE, BUFFERS) of the SQL behind every "
+        "endpoint; fail on sequential scans of large tables or buffer regressions"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="COUNT",
+        help="First insert COUNT synthetic buildings/organizations (use a scratch database)",
+    )
+    parser.add_argument(
+        "--output",
+        default="query_plans",
+        help="Directory with baselines.json and the per-endpoint plan snapshots",
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed relative growth of buffers over the baseline",
+    )
+    parser.add_argument(
+        "--min-rows",
+        type=float,
+        default=10000,
+        help="Sequential scans of tables smaller than this are allowed",
+    )
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args)) else 1)
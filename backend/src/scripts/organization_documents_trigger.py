@@ -0,0 +1,206 @@
+REFRESH_ORGANIZATION_DOCUMENTS = """
+    CREATE OR REPLACE FUNCTION refresh_organization_documents(org_ids INT[]) RETURNS void AS $$
+    BEGIN
+        -- Serialize refreshes of the same organization: a concurrent writer
+        -- waits here until the other transaction commits, and the render
+        -- below, a new statement, then sees its rows instead of overwriting
+        -- them with an older snapshot. NO KEY UPDATE does not conflict with
+        -- the KEY SHARE locks foreign key checks take on organizations.
+        PERFORM 1 FROM organizations
+        WHERE id = ANY(org_ids)
+        ORDER BY id
+        FOR NO KEY UPDATE;
+
+        INSERT INTO organization_documents
+            (organization_id, building_id, latitude, longitude, activity_ids, document)
+        SELECT
+            o.id,
+            b.id,
+            b.latitude,
+            b.longitude,
+            COALESCE(
+                (SELECT array_agg(oa.activity_id ORDER BY oa.activity_id)
+                 FROM organization_activities oa WHERE oa.organization_id = o.id),
+                '{}'
+            ),
+            jsonb_build_object(
+                'id', o.id,
+                'name', o.name,
+                'building', jsonb_build_object(
+                    'id', b.id,
+                    'address', b.address,
+                    'latitude', b.latitude,
+                    'longitude', b.longitude
+                ),
+                'phones', COALESCE(
+                    (SELECT jsonb_agg(jsonb_build_object('id', p.id, 'number', p.number) ORDER BY p.id)
+                     FROM organization_phones p WHERE p.organization_id = o.id),
+                    '[]'
+                ),
+                'activities', COALESCE(
+                    (SELECT jsonb_agg(
+                                jsonb_build_object('id', a.id, 'name', a.name, 'parent_id', a.parent_id)
+                                ORDER BY a.id)
+                     FROM organization_activities oa JOIN activities a ON a.id = oa.activity_id
+                     WHERE oa.organization_id = o.id),
+                    '[]'
+                )
+            )
+        FROM organizations o
+        JOIN buildings b ON b.id = o.building_id
+        WHERE o.id = ANY(org_ids)
+        ON CONFLICT (organization_id) DO UPDATE SET
+            building_id = EXCLUDED.building_id,
+            latitude = EXCLUDED.latitude,
+            longitude = EXCLUDED.longitude,
+            activity_ids = EXCLUDED.activity_ids,
+            document = EXCLUDED.document;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+# Statement-level triggers with transition tables: every statement refreshes
+# the affected organizations once, in a single set-based upsert. Deleted
+# organizations lose their document through the foreign key cascade.
+#
+# Only the name and the building of an organization are rendered: updates
+# that touch nothing else, such as the version bump link writes cause,
+# skip the refresh the link trigger already does.
+SYNC_ORGANIZATIONS = """
+    CREATE OR REPLACE FUNCTION organization_documents_sync_organizations() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM refresh_organization_documents(ARRAY(SELECT id FROM new_rows));
+        ELSE
+            PERFORM refresh_organization_documents(ARRAY(
+                SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE (n.name, n.building_id) IS DISTINCT FROM (o.name, o.building_id)
+            ));
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+SYNC_FUNCTIONS = (
+    SYNC_ORGANIZATIONS,
+    """
+    CREATE OR REPLACE FUNCTION organization_documents_sync_children() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM refresh_organization_documents(ARRAY(SELECT organization_id FROM new_rows));
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM refresh_organization_documents(ARRAY(SELECT organization_id FROM old_rows));
+        ELSE
+            PERFORM refresh_organization_documents(ARRAY(
+                SELECT organization_id FROM new_rows
+                UNION
+                SELECT organization_id FROM old_rows
+            ));
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+""",
+    """
+    CREATE OR REPLACE FUNCTION organization_documents_sync_buildings() RETURNS trigger AS $$
+    BEGIN
+        PERFORM refresh_organization_documents(ARRAY(
+            SELECT o.id FROM organizations o JOIN new_rows n ON o.building_id = n.id
+        ));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+""",
+    """
+    CREATE OR REPLACE FUNCTION organization_documents_sync_activities() RETURNS trigger AS $$
+    BEGIN
+        PERFORM refresh_organization_documents(ARRAY(
+            SELECT DISTINCT oa.organization_id
+            FROM organization_activities oa JOIN new_rows n ON oa.activity_id = n.id
+        ));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+""",
+)
+
+ORGANIZATIONS_UPDATE_TRIGGER = """
+    CREATE TRIGGER organization_documents_organizations_update
+    AFTER UPDATE ON organizations REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_organizations();
+"""
+
+SETUP_TRIGGERS = (
+    """
+    CREATE TRIGGER organization_documents_organizations_insert
+    AFTER INSERT ON organizations REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_organizations();
+""",
+    ORGANIZATIONS_UPDATE_TRIGGER,
+    """
+    CREATE TRIGGER organization_documents_phones_insert
+    AFTER INSERT ON organization_phones REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_children();
+""",
+    """
+    CREATE TRIGGER organization_documents_phones_update
+    AFTER UPDATE ON organization_phones REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_children();
+""",
+    """
+    CREATE TRIGGER organization_documents_phones_delete
+    AFTER DELETE ON organization_phones REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_children();
+""",
+    """
+    CREATE TRIGGER organization_documents_activities_link_insert
+    AFTER INSERT ON organization_activities REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_children();
+""",
+    """
+    CREATE TRIGGER organization_documents_activities_link_update
+    AFTER UPDATE ON organization_activities REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_children();
+""",
+    """
+    CREATE TRIGGER organization_documents_activities_link_delete
+    AFTER DELETE ON organization_activities REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_children();
+""",
+    """
+    CREATE TRIGGER organization_documents_buildings_update
+    AFTER UPDATE ON buildings REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_buildings();
+""",
+    """
+    CREATE TRIGGER organization_documents_activities_update
+    AFTER UPDATE ON activities REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION organization_documents_sync_activities();
+""",
+)
+
+BACKFILL = """
+    SELECT refresh_organization_documents(ARRAY(SELECT id FROM organizations));
+"""
+
+DROP_TRIGGERS = (
+    "DROP TRIGGER IF EXISTS organization_documents_organizations_insert ON organizations;",
+    "DROP TRIGGER IF EXISTS organization_documents_organizations_update ON organizations;",
+    "DROP TRIGGER IF EXISTS organization_documents_phones_insert ON organization_phones;",
+    "DROP TRIGGER IF EXISTS organization_documents_phones_update ON organization_phones;",
+    "DROP TRIGGER IF EXISTS organization_documents_phones_delete ON organization_phones;",
+    "DROP TRIGGER IF EXISTS organization_documents_activities_link_insert ON organization_activities;",
+    "DROP TRIGGER IF EXISTS organization_documents_activities_link_update ON organization_activities;",
+    "DROP TRIGGER IF EXISTS organization_documents_activities_link_delete ON organization_activities;",
+    "DROP TRIGGER IF EXISTS organization_documents_buildings_update ON buildings;",
+    "DROP TRIGGER IF EXISTS organization_documents_activities_update ON activities;",
+)
+
+DROP_FUNCTIONS = (
+    "DROP FUNCTION IF EXISTS organization_documents_sync_organizations();",
+    "DROP FUNCTION IF EXISTS organization_documents_sync_children();",
+    "DROP FUNCTION IF EXISTS organization_documents_sync_buildings();",
+    "DROP FUNCTION IF EXISTS organization_documents_sync_activities();",
+    "DROP FUNCTION IF EXISTS refresh_organization_documents(INT[]);",
+)
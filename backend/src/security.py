@@ -1,20 +1,140 @@
-from fastapi import Security, HTTPException, status
+from fastapi import Request, Security, HTTPException, status
 from fastapi.security import APIKeyHeader
+from dataclasses import dataclass
+from sqlalchemy import select
+import hashlib
+import hmac
+import json
+import logging
 import os
+import time
 
-API_KEY = os.getenv("API_KEY")
+from src.cache import TTLCache
+from src.database import AsyncSessionLocal
+from src.models import ApiKey
+
+logger = logging.getLogger("uvicorn.error")
 
-if API_KEY is None:
-    raise ValueError("API_KEY environment variable is not set.")
+API_KEY = os.getenv("API_KEY")
+API_KEYS_FILE = os.getenv("API_KEYS_FILE")
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", "4096"))
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "60"))
+API_KEY_NEGATIVE_CACHE_SIZE = int(os.getenv("API_KEY_NEGATIVE_CACHE_SIZE", "1024"))
+API_KEY_NEGATIVE_CACHE_TTL = float(os.getenv("API_KEY_NEGATIVE_CACHE_TTL", "5"))
+API_KEYS_FILE_CHECK_SECONDS = float(os.getenv("API_KEYS_FILE_CHECK_SECONDS", "5"))
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
-    if api_key is None or api_key != API_KEY:
+
+@dataclass(frozen=True)
+class ApiKeyInfo:
+    key_hash: str
+    tenant: str
+    scopes: frozenset[str]
+
+    def has_scope(self, scope: str) -> bool:
+        return "*" in self.scopes or scope in self.scopes
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+_LEGACY_KEY = (
+    ApiKeyInfo(hash_api_key(API_KEY), "default", frozenset({"*"}))
+    if API_KEY
+    else None
+)
+
+# key hash -> ApiKeyInfo
+_validated_keys = TTLCache(maxsize=API_KEY_CACHE_SIZE, ttl=API_KEY_CACHE_TTL)
+# Hashes of keys known to be invalid. Kept apart so that clients sending random
+# keys cannot evict valid keys.
+_rejected_keys = TTLCache(
+    maxsize=API_KEY_NEGATIVE_CACHE_SIZE, ttl=API_KEY_NEGATIVE_CACHE_TTL
+)
+
+_file_registry: dict[str, ApiKeyInfo] = {}
+_file_mtime: float | None = None
+_file_checked_at = 0.0
+
+
+def _load_file_registry() -> dict[str, ApiKeyInfo]:
+    """Keys file format: ``[{"key_hash": "<sha256 hex>", "tenant": "...",
+    "scopes": ["..."]}, ...]``. Entries with ``"revoked": true`` are skipped."""
+    global _file_registry, _file_mtime, _file_checked_at
+    if API_KEYS_FILE is None:
+        return _file_registry
+    now = time.monotonic()
+    if now - _file_checked_at < API_KEYS_FILE_CHECK_SECONDS:
+        return _file_registry
+    _file_checked_at = now
+    try:
+        mtime = os.stat(API_KEYS_FILE).st_mtime
+        if mtime == _file_mtime:
+            return _file_registry
+        with open(API_KEYS_FILE) as f:
+            entries = json.load(f)
+        registry = {
+            entry["key_hash"]: ApiKeyInfo(
+                entry["key_hash"], entry["tenant"], frozenset(entry.get("scopes", ()))
+            )
+            for entry in entries
+            if not entry.get("revoked", False)
+        }
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        # A missing or half-written file must not take authentication down.
+        logger.exception(
+            "Failed to load API keys file %s, keeping the last loaded keys",
+            API_KEYS_FILE,
+        )
+        return _file_registry
+    _file_registry = registry
+    _file_mtime = mtime
+    _validated_keys.clear()
+    _rejected_keys.clear()
+    return _file_registry
+
+
+async def _lookup_api_key(key_hash: str) -> ApiKeyInfo | None:
+    if _LEGACY_KEY is not None and hmac.compare_digest(key_hash, _LEGACY_KEY.key_hash):
+        return _LEGACY_KEY
+
+    info = _load_file_registry().get(key_hash)
+    if info is not None and hmac.compare_digest(key_hash, info.key_hash):
+        return info
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.revoked.is_(False))
+        )
+        api_key = result.scalars().first()
+    if api_key is not None and hmac.compare_digest(key_hash, api_key.key_hash):
+        return ApiKeyInfo(api_key.key_hash, api_key.tenant, frozenset(api_key.scopes))
+    return None
+
+
+async def verify_api_key(request: Request, api_key: str = Security(api_key_header)):
+    """Resolve the X-API-Key header against the legacy ``API_KEY``, the keys file
+    and the ``api_keys`` table. Only SHA-256 hashes are compared, and results
+    (including misses) are cached, so the registry is consulted at most once per
+    key per TTL. The resolved key is attached as ``request.state.api_key``.
+    Sub-requests of a batch carry the key already verified for the batch."""
+    info = getattr(request.state, "batch_api_key", None)
+    if info is None and api_key is not None:
+        key_hash = hash_api_key(api_key)
+        info = _validated_keys.get(key_hash)
+        if info is None and key_hash not in _rejected_keys:
+            info = await _lookup_api_key(key_hash)
+            if info is not None:
+                _validated_keys.set(key_hash, info)
+            else:
+                _rejected_keys.set(key_hash, True)
+    if info is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Failed to validate the api key",
             headers={"WWW-Authenticate": "X-API-Key"},
         )
-    return api_key
-
+    request.state.api_key = info
+    return info
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from src.ratelimit import take_token
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+# How long a duplicate waits for the shared response before running on its own.
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "5"))
+SINGLE_FLIGHT_PATH_PREFIX = "/api/"
+# File downloads are streamed, not buffered, so they are never shared.
+SINGLE_FLIGHT_EXCLUDED_PREFIXES = ("/api/snapshots/",)
+# Requests for part of a response are answered differently from the full one.
+_PARTIAL_REQUEST_HEADERS = ("range", "if-range")
+
+_in_flight: dict[tuple, asyncio.Future] = {}
+
+coalescing_stats = {
+    "executed": 0,
+    "coalesced": 0,
+    "timeouts": 0,
+    "not_shared": 0,
+}
+
+
+def get_coalescing_stats() -> dict:
+    """Counters plus the share of duplicate requests served from another
+    request's execution."""
+    handled = coalescing_stats["executed"] + coalescing_stats["coalesced"]
+    return {
+        **coalescing_stats,
+        "in_flight": len(_in_flight),
+        "coalescing_ratio": coalescing_stats["coalesced"] / handled if handled else 0.0,
+    }
+
+
+def request_key(scope) -> tuple:
+    """Requests are identical when they have the same method, path, query
+    parameters in any order and API key (so tenants never share responses)."""
+    query = urlencode(
+        sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True))
+    )
+    api_key = Headers(scope=scope).get("x-api-key", "")
+    return (
+        scope["method"],
+        scope["path"],
+        query,
+        hashlib.sha256(api_key.encode()).hexdigest(),
+    )
+
+
+def _shareable(messages: list[dict]) -> bool:
+    return (
+        bool(messages)
+        and messages[0]["status"] == 200
+        and messages[-1]["type"] == "http.response.body"
+        and not messages[-1].get("more_body", False)
+    )
+
+
+def _copy_message(message: dict) -> dict:
+    # Outer middleware edit the header list in place.
+    if message["type"] == "http.response.start":
+        return {**message, "headers": list(message["headers"])}
+    return dict(message)
+
+
+class SingleFlightMiddleware:
+    """Runs at most one execution per identical GET request at a time.
+    Duplicates arriving while it runs wait up to SINGLE_FLIGHT_WAIT_SECONDS and
+    replay its response instead of taking a connection of their own; each
+    replay is still charged to the rate limiter of its API key. Only complete
+    200 JSON responses are shared; otherwise, and on timeout, a duplicate is
+    executed normally. Snapshot downloads and Range requests are never
+    coalesced."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not SINGLE_FLIGHT_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(SINGLE_FLIGHT_PATH_PREFIX)
+            or scope["path"].startswith(SINGLE_FLIGHT_EXCLUDED_PREFIXES)
+            or any(name in Headers(scope=scope) for name in _PARTIAL_REQUEST_HEADERS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = request_key(scope)
+        shared = _in_flight.get(key)
+        if shared is not None:
+            await self._follow(shared, scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[key] = future
+        messages = []
+
+        capture = True
+
+        def settle(result):
+            if not future.done():
+                del _in_flight[key]
+                future.set_result(result)
+
+        async def send_wrapper(message):
+            nonlocal capture
+            if message["type"] == "http.response.start":
+                # Files and other non-JSON bodies are streamed, not buffered;
+                # waiting duplicates are released to run on their own at once.
+                content_type = Headers(raw=message["headers"]).get("content-type", "")
+                capture = content_type.startswith("application/json")
+                if not capture:
+                    settle(None)
+            if capture:
+                messages.append(_copy_message(message))
+            await send(message)
+
+        coalescing_stats["executed"] += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            settle(messages if capture and _shareable(messages) else None)
+
+    async def _follow(self, shared: asyncio.Future, scope, receive, send):
+        try:
+            messages = await asyncio.wait_for(
+                asyncio.shield(shared), SINGLE_FLIGHT_WAIT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            coalescing_stats["timeouts"] += 1
+            messages = None
+        else:
+            if messages is None:
+                coalescing_stats["not_shared"] += 1
+
+        if messages is None:
+            coalescing_stats["executed"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        # A shared 200 means the key was verified, so its bucket can be
+        # charged without resolving the key again.
+        try:
+            await take_token(request_key(scope)[-1])
+        except HTTPException as exc:
+            await JSONResponse(
+                {"detail": exc.detail}, exc.status_code, headers=exc.headers
+            )(scope, receive, send)
+            return
+
+        coalescing_stats["coalesced"] += 1
+        start, *body = messages
+        start = _copy_message(start)
+        start["headers"].append((b"x-coalesced", b"1"))
+        await send(start)
+        for message in body:
+            await send(dict(message))
@@ -0,0 +1,175 @@
+import asyncio
+import fcntl
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import Text, cast, select
+
+from src.database import engine
+from src.models import OrganizationDocument
+
+logger = logging.getLogger("uvicorn.error")
+
+SNAPSHOTS_ENABLED = os.getenv("SNAPSHOTS_ENABLED", "false").lower() == "true"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "3600"))
+SNAPSHOT_CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", "10000"))
+# Older snapshots stay downloadable by name (/snapshots/{name}) so downloads
+# resumed with Range can still finish after the latest one is replaced.
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "2"))
+SNAPSHOT_GZIP_LEVEL = int(os.getenv("SNAPSHOT_GZIP_LEVEL", "6"))
+
+LATEST_FILE = "latest.json"
+LOCK_FILE = ".build.lock"
+
+_SNAPSHOT_NAME = re.compile(r"directory-\d{8}T\d{12}Z\.ndjson\.gz")
+
+
+def snapshot_path(snapshot: dict) -> str:
+    return os.path.join(SNAPSHOT_DIR, snapshot["file"])
+
+
+def find_snapshot(name: str) -> str | None:
+    """Path of the retained snapshot file ``name``, None when there is no such
+    snapshot (any more)."""
+    if not _SNAPSHOT_NAME.fullmatch(name):
+        return None
+    path = os.path.join(SNAPSHOT_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def read_latest() -> dict | None:
+    """Metadata and chunk index of the current snapshot, None before the first
+    build."""
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, LATEST_FILE)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _is_fresh(snapshot: dict | None, max_age: float) -> bool:
+    if snapshot is None:
+        return False
+    created_at = datetime.fromisoformat(snapshot["created_at"])
+    return (datetime.now(timezone.utc) - created_at).total_seconds() < max_age
+
+
+def _compress_chunk(documents: list[str]) -> bytes:
+    # Every chunk is a complete gzip member: concatenated they form one valid
+    # gzip stream, and each can be decompressed on its own from its offset.
+    body = "\n".join(documents).encode() + b"\n"
+    return gzip.compress(body, compresslevel=SNAPSHOT_GZIP_LEVEL, mtime=0)
+
+
+def _write_atomically(path: str, data: bytes):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def _prune(current_file: str):
+    snapshots = sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "directory-*.ndjson.gz")))
+    for path in snapshots[:-SNAPSHOT_KEEP]:
+        if os.path.basename(path) != current_file:
+            os.remove(path)
+
+
+def _remove_temporary_files():
+    # Left behind by a build that crashed; the build lock is held, so no other
+    # process is writing them.
+    for path in glob.glob(os.path.join(SNAPSHOT_DIR, "*.tmp")):
+        os.remove(path)
+
+
+async def _write_snapshot() -> dict:
+    _remove_temporary_files()
+    created_at = datetime.now(timezone.utc)
+    name = f"directory-{created_at:%Y%m%dT%H%M%S%fZ}.ndjson.gz"
+    path = os.path.join(SNAPSHOT_DIR, name)
+    chunks = []
+    offset = 0
+    with open(f"{path}.tmp", "wb") as file:
+        async with engine.connect() as conn:
+            result = await conn.stream(
+                select(
+                    OrganizationDocument.organization_id,
+                    cast(OrganizationDocument.document, Text),
+                )
+                .order_by(OrganizationDocument.organization_id)
+                .execution_options(yield_per=SNAPSHOT_CHUNK_SIZE)
+            )
+            async for partition in result.partitions():
+                data = await asyncio.to_thread(
+                    _compress_chunk, [document for _, document in partition]
+                )
+                await asyncio.to_thread(file.write, data)
+                chunks.append(
+                    {
+                        "first_id": partition[0][0],
+                        "last_id": partition[-1][0],
+                        "count": len(partition),
+                        "offset": offset,
+                        "length": len(data),
+                    }
+                )
+                offset += len(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(f"{path}.tmp", path)
+
+    snapshot = {
+        "file": name,
+        "created_at": created_at.isoformat(),
+        "organizations": sum(chunk["count"] for chunk in chunks),
+        "size": offset,
+        "chunks": chunks,
+    }
+    # Readers switch to the new file only once it is complete.
+    _write_atomically(
+        os.path.join(SNAPSHOT_DIR, LATEST_FILE), json.dumps(snapshot).encode()
+    )
+    _prune(name)
+    return snapshot
+
+
+async def build_snapshot(max_age: float | None = None) -> dict | None:
+    """Write the organization directory as chunked gzip NDJSON with an
+    id/offset index and make it the latest snapshot. Only one process builds at
+    a time; returns None when another one holds the lock or, with ``max_age``,
+    when the latest snapshot is still fresh."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, LOCK_FILE), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        if max_age is not None and _is_fresh(read_latest(), max_age):
+            return None
+        return await _write_snapshot()
+
+
+async def maintain_snapshots():
+    """Rebuild the snapshot every SNAPSHOT_INTERVAL_SECONDS. Safe to run in
+    every worker: the lock and the freshness check let one of them build."""
+    while True:
+        try:
+            snapshot = await build_snapshot(max_age=SNAPSHOT_INTERVAL_SECONDS)
+            if snapshot is not None:
+                logger.info(
+                    "Built snapshot %s: %d organizations, %d bytes",
+                    snapshot["file"],
+                    snapshot["organizations"],
+                    snapshot["size"],
+                )
+        except Exception:
+            logger.exception("Failed to build the directory snapshot")
+        await asyncio.sleep(min(SNAPSHOT_INTERVAL_SECONDS, 60))
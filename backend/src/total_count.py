@@ -0,0 +1,114 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Literal
+
+from fastapi import Query, Request, Response
+from sqlalchemy import Table, func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import TTLCache
+from src.cost import estimate_rows
+
+TOTAL_COUNT_CACHE_SIZE = int(os.getenv("TOTAL_COUNT_CACHE_SIZE", "1024"))
+TOTAL_COUNT_CACHE_TTL = float(os.getenv("TOTAL_COUNT_CACHE_TTL", "60"))
+# Exact counts taking longer than this are cancelled and reported as estimates.
+TOTAL_COUNT_TIMEOUT_MS = int(os.getenv("TOTAL_COUNT_TIMEOUT_MS", "500"))
+
+# Query parameters that do not change which rows are counted.
+_NON_FILTER_PARAMETERS = frozenset({"offset", "limit", "fields", "include", "count"})
+
+_QUERY_CANCELED = "57014"
+
+# filter key -> exact count
+_exact_counts = TTLCache(maxsize=TOTAL_COUNT_CACHE_SIZE, ttl=TOTAL_COUNT_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class CountRequest:
+    mode: str
+    # Path, filter parameters and body, the same for every page of a listing.
+    key: tuple
+
+
+async def get_count_request(
+    request: Request,
+    count: Literal["exact", "estimated"] | None = Query(
+        None, description="Report the total number of matches in X-Total-Count"
+    ),
+) -> CountRequest | None:
+    if count is None:
+        return None
+    filters = tuple(
+        sorted(
+            (name, value)
+            for name, value in request.query_params.multi_items()
+            if name not in _NON_FILTER_PARAMETERS
+        )
+    )
+    body_hash = hashlib.sha256(await request.body()).hexdigest()
+    return CountRequest(count, (request.url.path, filters, body_hash))
+
+
+async def _estimate_count(session: AsyncSession, stmt) -> int:
+    froms = stmt.get_final_froms()
+    if stmt.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table):
+        # Unfiltered listing: the table size kept up to date by (auto)analyze.
+        reltuples = await session.scalar(
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": froms[0].name},
+        )
+        # -1 until the table has been analyzed for the first time.
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+    return await estimate_rows(session, stmt)
+
+
+async def _exact_count(session: AsyncSession, stmt) -> int | None:
+    """COUNT(*) of ``stmt`` under TOTAL_COUNT_TIMEOUT_MS, None when it timed
+    out. Runs in a savepoint that is always rolled back, which also undoes the
+    statement timeout."""
+    savepoint = await session.begin_nested()
+    try:
+        await session.execute(
+            text(f"SET LOCAL statement_timeout = {TOTAL_COUNT_TIMEOUT_MS}")
+        )
+        return await session.scalar(
+            stmt.with_only_columns(func.count(), maintain_column_froms=True)
+        )
+    except DBAPIError as error:
+        if getattr(error.orig, "sqlstate", None) != _QUERY_CANCELED:
+            raise
+        return None
+    finally:
+        await savepoint.rollback()
+
+
+async def set_total_count(
+    session: AsyncSession,
+    response: Response,
+    count_request: CountRequest | None,
+    stmt=None,
+    total: int | None = None,
+):
+    """Report the number of rows matched by ``stmt`` (the unpaged, unordered
+    listing query) in X-Total-Count, and whether it is exact or estimated in
+    X-Total-Count-Mode. Estimates cost one catalog lookup or EXPLAIN; exact
+    counts are cached per filter key and fall back to the estimate when they
+    exceed TOTAL_COUNT_TIMEOUT_MS. Callers that already know the total pass
+    ``total`` instead."""
+    if count_request is None:
+        return
+    mode = "exact"
+    if total is None and count_request.mode == "exact":
+        total = _exact_counts.get(count_request.key)
+        if total is None:
+            total = await _exact_count(session, stmt)
+            if total is not None:
+                _exact_counts.set(count_request.key, total)
+    if total is None:
+        mode = "estimated"
+        total = await _estimate_count(session, stmt)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Count-Mode"] = mode
@@ -0,0 +1,166 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+
+from fastapi import HTTPException, Response, params
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from sqlalchemy import text
+
+from src.database import engine, AsyncSessionLocal
+from src.schemas import GeoJsonPolygonSchema, RadiusBatchQuerySchema
+from src.routers.api import router
+from src.routers import organizations, buildings, activities, changes
+
+logger = logging.getLogger("uvicorn.error")
+
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "5"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+startup_state = {
+    "ready": False,
+    "import_seconds": None,
+    "warmup_seconds": None,
+    "first_request_seconds": None,
+}
+
+# Endpoint functions are called directly with representative arguments, so the
+# statements they build land in the engine's compiled cache exactly as they
+# will be issued by real requests (limit/offset and literals are bound
+# parameters and do not change the cache key).
+_WARMUP_POLYGON = GeoJsonPolygonSchema(
+    type="Polygon", coordinates=[[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]
+)
+
+_WARMUP_CALLS = (
+    (activities.read_activities, {"limit": 1}),
+    (changes.read_changes, {"limit": 1}),
+    (activities.read_activity, {"activity_id": 1, "with_counts": True}),
+    (buildings.read_buildings, {"limit": 1}),
+    (buildings.read_building, {"building_id": 1}),
+    (
+        buildings.read_buildings_in_radius,
+        {"latitude": 0.0, "longitude": 0.0, "radius_km": 1.0, "limit": 1},
+    ),
+    (
+        buildings.read_buildings_in_rectangle,
+        {"latitude": 0.0, "longitude": 0.0, "width": 1.0, "height": 1.0, "limit": 1},
+    ),
+    (buildings.read_buildings_in_polygon, {"area": _WARMUP_POLYGON, "limit": 1}),
+    (organizations.read_organizations, {"limit": 1}),
+    (
+        organizations.read_organization_facets,
+        {"latitude": 0.0, "longitude": 0.0, "radius_km": 1.0},
+    ),
+    (organizations.read_organization, {"organization_id": 1}),
+    (organizations.read_organizations_by_building, {"building_id": 1, "limit": 1}),
+    (organizations.read_organization_by_activity, {"activity_id": 1, "limit": 1}),
+    (organizations.read_organization_by_activity_branch, {"activity_id": 1, "limit": 1}),
+    (organizations.read_organization_by_name, {"name": "warmup"}),
+    (organizations.read_organizations_by_phone, {"number": "0", "limit": 1}),
+    (
+        organizations.read_organizations_in_radius,
+        {"latitude": 0.0, "longitude": 0.0, "radius_km": 1.0, "limit": 1},
+    ),
+    (
+        organizations.read_organizations_in_radius_batch,
+        {
+            "query": RadiusBatchQuerySchema(
+                centers=[{"latitude": 0.0, "longitude": 0.0, "radius_km": 1.0}]
+            ),
+            "limit": 1,
+        },
+    ),
+    (
+        organizations.read_organizations_in_rectangle,
+        {"latitude": 0.0, "longitude": 0.0, "width": 1.0, "height": 1.0, "limit": 1},
+    ),
+    (
+        organizations.read_organizations_in_polygon,
+        {"area": _WARMUP_POLYGON, "limit": 1},
+    ),
+)
+
+
+async def endpoint_kwargs(endpoint, session, **overrides) -> dict:
+    """Arguments for calling a route function outside of a request: the given
+    overrides, the session, a fresh Response, no Request and the declared
+    defaults of the remaining query parameters and dependencies."""
+    kwargs = {}
+    for name, parameter in inspect.signature(endpoint).parameters.items():
+        if name in overrides:
+            kwargs[name] = overrides[name]
+        elif name == "session":
+            kwargs[name] = session
+        elif name == "response":
+            kwargs[name] = Response()
+        elif name == "request":
+            kwargs[name] = None
+        elif isinstance(parameter.default, params.Depends):
+            # Plain query-parameter dependencies, resolved with their defaults.
+            dependency = parameter.default.dependency
+            value = dependency(**await endpoint_kwargs(dependency, session))
+            kwargs[name] = await value if inspect.isawaitable(value) else value
+        elif isinstance(parameter.default, params.Param) and not (
+            parameter.default.is_required()
+        ):
+            kwargs[name] = parameter.default.default
+    return kwargs
+
+
+def _response_adapters():
+    return {
+        route.endpoint: TypeAdapter(route.response_model)
+        for route in router.routes
+        if isinstance(route, APIRoute) and route.response_model is not None
+    }
+
+
+async def _warm_pool():
+    connections = await asyncio.gather(
+        *(engine.connect() for _ in range(WARMUP_CONNECTIONS))
+    )
+    try:
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in connections))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in connections))
+
+
+async def _warm_statements():
+    adapters = _response_adapters()
+    async with AsyncSessionLocal() as session:
+        for endpoint, kwargs in _WARMUP_CALLS:
+            try:
+                kwargs = await endpoint_kwargs(endpoint, session, **kwargs)
+                result = await endpoint(**kwargs)
+            except HTTPException:
+                continue
+            adapter = adapters.get(endpoint)
+            if adapter is not None:
+                adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+
+async def warmup():
+    """Fill the connection pool, the compiled statement cache and the response
+    validators before the application reports itself ready."""
+    while True:
+        started = time.perf_counter()
+        try:
+            await _warm_pool()
+            await _warm_statements()
+        except Exception:
+            logger.exception(
+                "Warm-up failed, retrying in %s seconds", WARMUP_RETRY_SECONDS
+            )
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+            continue
+        startup_state["warmup_seconds"] = time.perf_counter() - started
+        startup_state["ready"] = True
+        logger.info(
+            "Warm-up finished in %.3fs (imports took %.3fs)",
+            startup_state["warmup_seconds"],
+            startup_state["import_seconds"] or 0.0,
+        )
+        return